@@ -0,0 +1,69 @@
+"""Benchmark for building agent instructions at session start.
+
+Every chat session builds its agents' instructions by loading and rendering
+the prompts in prompts/. This times that per session with prompty directly
+(parse the file and render on every call, as before the prompt cache) and
+with PromptyService (parsed once, rendered with the precompiled template),
+checks both produce the same instructions, and reports ms per session.
+Prompts that are still empty in this checkout of the labs are skipped.
+
+Run from the src directory:
+    python -m benchmarks.agent_session
+"""
+import time
+
+import prompty
+
+from config.settings import config
+from services.prompt_service import PromptyService
+
+SESSIONS = 200
+
+
+def session_data() -> dict:
+    with open(config.DESIRED_TERMS_PATH, "r", encoding="utf-8") as f:
+        desired_terms = f.read()
+    return {
+        "desired_terms": desired_terms,
+        "uploaded_contract": "The Consultant shall provide the Services described in each Statement of Work.",
+        "template_contract": "The Consultant shall perform the Services with reasonable care and skill.",
+    }
+
+
+def legacy_instructions(service: PromptyService, names: list[str], data: dict) -> list[str]:
+    instructions = []
+    for name in names:
+        messages = prompty.prepare(prompty.load(service.PROMPTS_DIRECTORY / name), data)
+        instructions.append("\n".join(msg["content"] for msg in messages if msg.get("content")))
+    return instructions
+
+
+def cached_instructions(service: PromptyService, names: list[str], data: dict) -> list[str]:
+    return [service.render_prompt_as_string(service.load_prompt(name), data) for name in names]
+
+
+def main():
+    service = PromptyService()
+    start = time.perf_counter()
+    service.preload()
+    preload_seconds = time.perf_counter() - start
+
+    names = [path.name for path in sorted(service.PROMPTS_DIRECTORY.glob("*.prompty")) if path.stat().st_size]
+    if not names:
+        raise SystemExit("No prompts written yet, nothing to benchmark")
+    data = session_data()
+    if legacy_instructions(service, names, data) != cached_instructions(service, names, data):
+        raise SystemExit("Cached prompts render differently from prompty")
+
+    print(f"{len(names)} prompts per session, preloaded in {preload_seconds * 1000:.1f} ms")
+    for label, build in (("prompty.load + prepare", legacy_instructions), ("PromptyService", cached_instructions)):
+        start = time.perf_counter()
+        for _ in range(SESSIONS):
+            build(service, names, data)
+        seconds = (time.perf_counter() - start) / SESSIONS
+        print(f"{label:24s} {seconds * 1000:8.2f} ms per session")
+    print(f"Prompt cache: {service.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Parity check and benchmark for the compiled clause classifier.
+
+Classifies a synthetic set of contract headings with a plain scan over the
+rule table (normalize, special cases, then each pattern of `RULES` in order)
+and with `CompiledClauseClassifier`, fails if any heading gets a different
+clause type, and reports per-heading throughput of both, cold and memoized.
+Needs the rule step of lab 1 to be in place.
+
+Run from the src directory:
+    python -m benchmarks.clause_classifier
+"""
+import random
+import time
+from typing import Optional
+
+from utils.clause_classifier import RULES, SPECIAL_RULES, CompiledClauseClassifier
+
+HEADING_COUNT = 20_000
+PREFIXES = ["", "1. ", "2.3 ", "IV. ", "Section 4.1: ", "Article 7 - ", "(a) ", "B) ", "§ 12. ", "## "]
+EXTRA_HEADINGS = [
+    "Term and Termination", "Fees and Payment Terms", "Miscellaneous", "Signature Page",
+    "Recitals", "Statement of Work", "Non-Solicitation", "Force Majeure", "Insurance",
+    "Schedule A", "Exhibit B - Rates", "Attorneys' Fees", "Auto-Renewal", "Limitation of Liability",
+    "Work Made for Hire", "Pre-existing Materials", "Non-Disclosure", "General", "",
+]
+
+
+def rule_table_classify(heading: str, default: Optional[str] = None) -> Optional[str]:
+    """Reference classifier: the linear scan over the rule table."""
+    if not heading or not heading.strip():
+        return default
+    h = CompiledClauseClassifier.normalize(heading)
+    for clause_type, patterns in SPECIAL_RULES + RULES:
+        for pattern in patterns:
+            if pattern.search(h):
+                return clause_type
+    return default
+
+
+def build_headings(count: int = HEADING_COUNT) -> list[str]:
+    """Headings built from the words the rules look for, with numbering and case variations."""
+    rng = random.Random(42)
+    words = [clause_type.replace("_", " ") for clause_type, _ in RULES] + EXTRA_HEADINGS
+    headings = []
+    for _ in range(count):
+        title = " and ".join(rng.sample(words, rng.choice([1, 1, 2])))
+        title = rng.choice([str.title, str.upper, str.lower, str])(title)
+        headings.append(rng.choice(PREFIXES) + title)
+    return headings
+
+
+def main():
+    headings = build_headings()
+
+    mismatches = [
+        (heading, expected, actual)
+        for heading, expected, actual in zip(
+            headings,
+            (rule_table_classify(h) for h in headings),
+            CompiledClauseClassifier().classify_many(headings),
+        )
+        if expected != actual
+    ]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} headings classified differently, e.g. {mismatches[:5]}")
+    print(f"{len(headings)} headings ({len(set(headings))} distinct), compiled classifier agrees with the rule table")
+
+    start = time.perf_counter()
+    for heading in headings:
+        rule_table_classify(heading)
+    scan_seconds = time.perf_counter() - start
+
+    classifier = CompiledClauseClassifier(memo_size=0)
+    start = time.perf_counter()
+    for heading in headings:
+        classifier.classify(heading)
+    compiled_seconds = time.perf_counter() - start
+
+    classifier = CompiledClauseClassifier()
+    start = time.perf_counter()
+    classifier.classify_many(headings)
+    memo_seconds = time.perf_counter() - start
+
+    for name, seconds in (
+        ("Rule table scan", scan_seconds),
+        ("Compiled, no memo", compiled_seconds),
+        ("Compiled batch + memo", memo_seconds),
+    ):
+        print(f"{name:22s} {len(headings) / seconds:10.0f} headings/sec ({seconds * 1e6 / len(headings):6.2f} µs/heading)")
+
+
+if __name__ == "__main__":
+    main()
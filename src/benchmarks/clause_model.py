@@ -0,0 +1,93 @@
+"""Benchmark for the Clause model.
+
+Builds 10,000 clauses from search-result shaped dicts with the previous
+__dict__-based Clause class and the tuple-based Clause, and reports
+construction time and the memory each representation holds on to (strings
+are shared by both and not counted). The tuple-based Clause is built in about
+the same time and holds about as much as the previous class.
+
+Run from the src directory:
+    python -m benchmarks.clause_model
+"""
+import time
+import tracemalloc
+
+from models.clause import Clause
+
+CLAUSE_COUNT = 10_000
+CLAUSE_TYPES = ["termination", "payment", "confidentiality", "liability", ""]
+
+
+class LegacyClause:
+    """The previous Clause: a plain class with a per-instance __dict__."""
+    def __init__(self, id, doc_id, section_index, section, text_full, text_clean, entity_type, clause_type, is_template):
+        self.id = id
+        self.doc_id = doc_id
+        self.section_index = section_index
+        self.section = section
+        self.text_full = text_full
+        self.text_clean = text_clean
+        self.entity_type = entity_type
+        self.clause_type = clause_type
+        self.is_template = is_template
+
+    @staticmethod
+    def from_dict(data: dict) -> "LegacyClause":
+        return LegacyClause(
+            id=data["id"],
+            doc_id=data["doc_id"],
+            section_index=data["section_index"],
+            section=data["section"],
+            text_full=data["text_full"],
+            text_clean=data["text_clean"],
+            entity_type=data.get("entity_type", ""),
+            clause_type=data.get("clause_type", ""),
+            is_template=data.get("is_template", False)
+        )
+
+
+def build_results(count: int = CLAUSE_COUNT) -> list[dict]:
+    return [
+        {
+            "id": f"contract_{i}",
+            "doc_id": "contract.pdf",
+            "section_index": i,
+            "section": f"Section {i}",
+            "text_full": f"Section {i} the consultant shall provide the services described in the statement of work",
+            "text_clean": f"section {i} consultant provide services described statement work",
+            "entity_type": "clause",
+            "clause_type": CLAUSE_TYPES[i % len(CLAUSE_TYPES)],
+            "is_template": False,
+        }
+        for i in range(count)
+    ]
+
+
+def measure(build, results: list[dict]) -> tuple[float, int]:
+    """Return (seconds, bytes retained) to build a representation of results."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build(results)
+    seconds = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return seconds, retained
+
+
+def main():
+    results = build_results()
+    candidates = {
+        "Legacy Clause": lambda rows: [LegacyClause.from_dict(row) for row in rows],
+        "Clause": lambda rows: [Clause.from_dict(row) for row in rows],
+    }
+
+    print(f"{CLAUSE_COUNT} clauses")
+    for name, build in candidates.items():
+        build(results)  # warm up
+        seconds, retained = measure(build, results)
+        print(f"{name:14s} built in {seconds * 1000:7.1f} ms, holding {retained / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark for EmbeddingService.split_text_into_batches.
+
+Compares the number of embedding requests and the planning time of the
+batch planner against the previous greedy one-pass splitter, on a
+synthetic set of contract clauses of mixed length.
+
+Run from the src directory:
+    python -m benchmarks.embedding_batches
+"""
+import random
+import time
+
+import tiktoken
+
+from services.embedding_service import EmbeddingService, SUPPORTED_BATCH_AOAI_MODEL
+
+CLAUSE_COUNT = 2000
+SENTENCE = "the consultant shall provide services described statement work reasonable care skill "
+
+
+def build_clauses(count: int = CLAUSE_COUNT) -> list[str]:
+    rng = random.Random(42)
+    # Mostly short boilerplate clauses with a long tail of long ones
+    return [SENTENCE * max(1, int(rng.paretovariate(1.2) * 4)) for _ in range(count)]
+
+
+def greedy_batches(service: EmbeddingService, texts: list[str]) -> int:
+    """The previous splitter: per-text encoder lookup and a greedy single pass. Returns the request count."""
+    batch_info = SUPPORTED_BATCH_AOAI_MODEL[service.model_name]
+    batches, batch, batch_tokens = 0, 0, 0
+    for text in texts:
+        tokens = len(tiktoken.encoding_for_model(service.model_name).encode(text))
+        if batch_tokens + tokens >= batch_info["token_limit"] and batch > 0:
+            batches, batch, batch_tokens = batches + 1, 0, 0
+        batch, batch_tokens = batch + 1, batch_tokens + tokens
+        if batch == batch_info["max_batch_size"]:
+            batches, batch, batch_tokens = batches + 1, 0, 0
+    return batches + (1 if batch else 0)
+
+
+def main():
+    service = EmbeddingService()
+    texts = build_clauses()
+    service.calculate_token_length(texts[0])  # load the tokenizer outside the timings
+
+    start = time.perf_counter()
+    greedy_requests = greedy_batches(service, texts)
+    greedy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planned = service.split_text_into_batches(texts)
+    planner_seconds = time.perf_counter() - start
+
+    assert sorted(i for batch in planned for i in batch.indices) == list(range(len(texts)))
+
+    token_limit, max_batch_size = service.get_batch_limits()
+    print(f"{len(texts)} clauses, limits: {token_limit} tokens / {max_batch_size} inputs per request")
+    print(f"Greedy splitter: {greedy_requests:5d} requests, planned in {greedy_seconds * 1000:8.1f} ms")
+    print(f"Batch planner:   {len(planned):5d} requests, planned in {planner_seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Memory benchmark for the embedding representation of one document.
+
+Simulates embedding and uploading a 2,000-clause document at 3072
+dimensions, once keeping embeddings as lists of Python floats (the previous
+representation) and once as a float32 matrix that is only turned into JSON
+lists per upload batch. Each variant runs in a fresh process and reports how
+far it raised the peak RSS of that process.
+
+Run from the src directory:
+    python -m benchmarks.embedding_memory
+"""
+import base64
+import multiprocessing
+import resource
+import sys
+
+import numpy as np
+
+from services.embedding_service import EmbeddingService
+from services.search_uploader import SearchUploader
+
+CLAUSE_COUNT = 2000
+DIMENSIONS = 3072
+API_BATCH_SIZE = 16
+
+
+def api_responses(count: int = CLAUSE_COUNT):
+    """Yield batches of base64 embeddings shaped like the embeddings API returns them."""
+    rng = np.random.default_rng(42)
+    for start in range(0, count, API_BATCH_SIZE):
+        rows = rng.standard_normal((min(API_BATCH_SIZE, count - start), DIMENSIONS), dtype=np.float32)
+        yield [base64.b64encode(row.tobytes()).decode("ascii") for row in rows]
+
+
+def documents(count: int = CLAUSE_COUNT) -> list[dict]:
+    return [{"id": f"doc_{i}", "text_clean": "the consultant shall provide services"} for i in range(count)]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_lists() -> int:
+    """Previous representation: decoded to float lists, every document built before uploading."""
+    embeddings: list[list[float]] = []
+    for batch in api_responses():
+        embeddings.extend(EmbeddingService.decode_embedding(data).tolist() for data in batch)
+    docs = documents()
+    for doc, embedding in zip(docs, embeddings):
+        doc["embeddings"] = embedding
+    return sum(len(batch) for batch, _ in SearchUploader(search_client=None).plan_batches(docs))
+
+
+def run_matrix() -> int:
+    """float32 matrix filled row by row, converted to lists only for the batch being sent."""
+    embeddings = np.empty((CLAUSE_COUNT, DIMENSIONS), dtype=np.float32)
+    row = 0
+    for batch in api_responses():
+        for data in batch:
+            embeddings[row] = EmbeddingService.decode_embedding(data)
+            row += 1
+    docs = documents()
+    for doc, embedding in zip(docs, embeddings):
+        doc["embeddings"] = embedding
+    sent = 0
+    for batch, _ in SearchUploader(search_client=None).plan_batches(docs):
+        payload = [SearchUploader.to_wire(doc) for doc in batch]
+        sent += len(payload)
+    return sent
+
+
+def measure(name: str, results) -> None:
+    before = peak_rss_mb()
+    documents_sent = globals()[name]()
+    results.put((name, documents_sent, peak_rss_mb() - before))
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    print(f"{CLAUSE_COUNT} clauses x {DIMENSIONS} dimensions")
+    for name in ("run_lists", "run_matrix"):
+        process = context.Process(target=measure, args=(name, results))
+        process.start()
+        name, documents_sent, growth = results.get()
+        process.join()
+        print(f"{name:12s} {documents_sent} documents, peak RSS grew by {growth:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
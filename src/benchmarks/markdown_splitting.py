@@ -0,0 +1,90 @@
+"""Parity check and benchmark for MarkdownSectionSplitter.
+
+Splits every document in the local Document Intelligence cache (the pages of
+contracts analyzed so far) with LangChain's MarkdownHeaderTextSplitter on the
+combined text and with MarkdownSectionSplitter page by page, fails if any
+chunk text or header metadata differs, and reports the time each takes. When
+the cache is empty a synthetic 300-page contract is used instead.
+
+Run from the src directory:
+    python -m benchmarks.markdown_splitting
+"""
+import random
+import time
+
+from langchain_text_splitters import MarkdownHeaderTextSplitter
+
+from models.document import Page
+from processors.document_processor import DocumentProcessor
+from services.document_cache import DocumentIntelligenceCache
+from utils.markdown_sections import MarkdownSectionSplitter
+
+ROUNDS = 5
+SYNTHETIC_PAGES = 300
+
+
+def cached_documents() -> list[list[Page]]:
+    cache = DocumentIntelligenceCache()
+    return [
+        pages for path in sorted(cache.directory.glob(f"*{cache.FILE_SUFFIX}"))
+        if (pages := cache.get(path.name[:-len(cache.FILE_SUFFIX)]))
+    ]
+
+
+def synthetic_document(page_count: int = SYNTHETIC_PAGES) -> list[Page]:
+    rng = random.Random(42)
+    sentence = "The Consultant shall provide the Services described in the Statement of Work. "
+    pages, offset, section = [], 0, 0
+    for page_num in range(1, page_count + 1):
+        parts = []
+        for _ in range(rng.randint(2, 4)):
+            section += 1
+            if section % 10 == 1:
+                parts.append(f"# Article {section // 10 + 1}\n\n")
+            parts.append(f"## {section}. Section heading\n\n")
+            parts.extend(sentence * rng.randint(1, 6) + "\n\n" for _ in range(rng.randint(1, 4)))
+        # Pages break mid-paragraph, like Document Intelligence output does
+        text = "".join(parts)
+        text = text[:len(text) - rng.randint(0, 40)]
+        pages.append(Page(page_num=page_num, offset=offset, text=text))
+        offset += len(text)
+    return pages
+
+
+def main():
+    documents = cached_documents() or [synthetic_document()]
+    headers = DocumentProcessor.DEFAULT_HEADERS
+    langchain_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers, strip_headers=True)
+    section_splitter = MarkdownSectionSplitter(headers_to_split_on=headers)
+
+    for pages in documents:
+        expected = [
+            (chunk.page_content, chunk.metadata)
+            for chunk in langchain_splitter.split_text("".join(page.text for page in pages))
+        ]
+        actual = [(section.page_content, section.metadata) for section in section_splitter.split_pages(pages)]
+        if expected != actual:
+            raise SystemExit(f"Section boundaries differ from LangChain for a {len(pages)}-page document")
+
+    page_count = sum(len(pages) for pages in documents)
+    print(f"{len(documents)} documents, {page_count} pages, section boundaries match LangChain")
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for pages in documents:
+            langchain_splitter.split_text("".join(page.text for page in pages))
+    langchain_seconds = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for pages in documents:
+            for _ in section_splitter.split_pages(pages):
+                pass
+    native_seconds = (time.perf_counter() - start) / ROUNDS
+
+    print(f"MarkdownHeaderTextSplitter: {langchain_seconds * 1000:8.1f} ms ({page_count / langchain_seconds:8.0f} pages/sec)")
+    print(f"MarkdownSectionSplitter:    {native_seconds * 1000:8.1f} ms ({page_count / native_seconds:8.0f} pages/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Micro-benchmark for DocumentIntelligenceService.extract_pages.
+
+Builds a synthetic 500-page AnalyzeResult and compares the span-based
+extractor with the previous character-by-character loop.
+
+Run from the src directory:
+    python -m benchmarks.page_extraction
+"""
+import time
+from types import SimpleNamespace
+
+from services.document_intelligence import DocumentIntelligenceService
+
+PAGE_COUNT = 500
+PARAGRAPHS_PER_PAGE = 12
+
+
+def build_analyze_result(page_count: int = PAGE_COUNT) -> SimpleNamespace:
+    """Build an object shaped like AnalyzeResult with one table and one figure every 5 pages."""
+    parts: list[str] = []
+    pages, tables, figures = [], [], []
+    offset = 0
+
+    def add(text: str) -> SimpleNamespace:
+        nonlocal offset
+        span = SimpleNamespace(offset=offset, length=len(text))
+        parts.append(text)
+        offset += len(text)
+        return span
+
+    for page_number in range(1, page_count + 1):
+        page_start = offset
+        add(f"## Section {page_number}\n\n")
+        for paragraph in range(PARAGRAPHS_PER_PAGE):
+            add(f"The Consultant shall perform the services described in paragraph {paragraph} "
+                f"with reasonable care and skill, and shall deliver all work product on time.\n\n")
+        if page_number % 5 == 0:
+            tables.append(SimpleNamespace(spans=[add("| Rate | Amount |\n| --- | --- |\n| Hourly | $150 |\n\n")]))
+            figures.append(SimpleNamespace(spans=[add("<figure>\nCompany logo\n</figure>\n\n")]))
+        add("<!-- PageBreak -->\n")
+        pages.append(SimpleNamespace(
+            page_number=page_number,
+            spans=[SimpleNamespace(offset=page_start, length=offset - page_start)],
+        ))
+
+    return SimpleNamespace(content="".join(parts), pages=pages, tables=tables, figures=figures)
+
+
+def legacy_extract(analyze_result) -> list[str]:
+    """The previous per-character extraction loop, kept here for comparison."""
+    texts = []
+    for page in analyze_result.pages:
+        page_offset = page.spans[0].offset
+        page_length = page.spans[0].length
+        mask_chars = [(None, None)] * page_length
+        page_text = ""
+        for idx, mask_char in enumerate(mask_chars):
+            page_text += analyze_result.content[page_offset + idx]
+        texts.append(page_text.replace("<!-- PageBreak -->", "").strip())
+    return texts
+
+
+def main():
+    analyze_result = build_analyze_result()
+    service = DocumentIntelligenceService(masked_objects=set())
+    print(f"Synthetic document: {len(analyze_result.pages)} pages, {len(analyze_result.content):,} characters")
+
+    start = time.perf_counter()
+    legacy = legacy_extract(analyze_result)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pages = list(service.extract_pages(analyze_result))
+    span_seconds = time.perf_counter() - start
+
+    assert [page.text for page in pages] == legacy, "span extractor output differs from the legacy loop"
+
+    print(f"Legacy per-character loop: {legacy_seconds * 1000:8.1f} ms")
+    print(f"Span-based extractor:      {span_seconds * 1000:8.1f} ms")
+    print(f"Speedup:                   {legacy_seconds / span_seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Parity check for the local template index against the remote hybrid ranking.
+
+Needs the bundled data/template-01.pdf to be indexed already (upload it in the
+app, or run the ingestion). Runs one query per clause type and per template
+section heading through both the local index and Azure Search, and reports
+how often the top clause agrees and how long each path takes.
+
+The local index serves agent lookups only with TEMPLATE_INDEX_ENABLED=true;
+turn it on for a deployment once this check passes there.
+
+Run from the src directory:
+    python -m benchmarks.template_index_parity
+"""
+import asyncio
+import time
+
+from services.client_registry import client_registry
+from services.embedding_service import EmbeddingService
+from services.search_service import SearchService
+from services.template_index import TemplateIndex
+from utils.clause_classifier import CLAUSE_TYPES
+
+TEMPLATE_DOC_ID = "template-01.pdf"
+
+# Agreement below this fails the check
+MIN_AGREEMENT = 0.9
+
+
+async def main():
+    search_service = SearchService(EmbeddingService())
+    await search_service.ensure_template_index()
+    template_clauses = [c for c in search_service.template_index.clauses if c.doc_id == TEMPLATE_DOC_ID]
+    if not template_clauses:
+        raise SystemExit(f"{TEMPLATE_DOC_ID} is not indexed, upload it before running this check")
+
+    queries = [clause_type.replace("_", " ") for clause_type in CLAUSE_TYPES]
+    queries += [clause.section for clause in template_clauses if clause.section]
+
+    agreed, local_seconds, remote_seconds = 0, 0.0, 0.0
+    for query in queries:
+        # Warm the query vector so both paths are timed on search alone
+        query_vector = await search_service.get_query_vector(query)
+
+        start = time.perf_counter()
+        # Queried directly, TEMPLATE_INDEX_ENABLED may still be off while parity is checked
+        local = search_service.template_index.search(query, query_vector, top=1)[0][0]
+        local_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        remote = await search_service.search_remote_hybrid(query, TemplateIndex.FILTER, query_vector)
+        remote_seconds += time.perf_counter() - start
+
+        same = local is not None and remote is not None and local.id == remote.id
+        agreed += same
+        if not same:
+            print(f"  differs for {query!r}: local={local and local.id} remote={remote and remote.id}")
+
+    agreement = agreed / len(queries)
+    print(f"{len(queries)} queries, top-1 agreement {agreement:.0%}")
+    print(f"Local index:  {local_seconds / len(queries) * 1e6:10.0f} us per query")
+    print(f"Azure Search: {remote_seconds / len(queries) * 1e6:10.0f} us per query")
+
+    await client_registry.close()
+    if agreement < MIN_AGREEMENT:
+        raise SystemExit(f"Top-1 agreement {agreement:.0%} is below {MIN_AGREEMENT:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
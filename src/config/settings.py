@@ -20,9 +20,64 @@ class Config:
     # Document Intelligence Configuration
     AZURE_DOCUMENTINTELLIGENCE_SERVICE = os.getenv("AZURE_DOCUMENTINTELLIGENCE_SERVICE", "doci-agentcon")
     AZURE_DOCUMENTINTELLIGENCE_API_KEY = os.getenv("AZURE_DOCUMENTINTELLIGENCE_API_KEY", "")
+    DOCUMENT_INTELLIGENCE_CACHE_DIR = os.getenv("DOCUMENT_INTELLIGENCE_CACHE_DIR", ".cache/document-intelligence")
+    DOCUMENT_INTELLIGENCE_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_INTELLIGENCE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Query Cache Configuration
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    QUERY_EMBEDDING_CACHE_TTL = float(os.environ.get("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+    # Serve template lookups from the local index instead of Azure Search; off until
+    # benchmarks/template_index_parity.py shows the rankings agree for the deployment
+    TEMPLATE_INDEX_ENABLED = os.environ.get("TEMPLATE_INDEX_ENABLED", "false").lower() == "true"
+    # Seconds before the local template index is reloaded to pick up templates indexed elsewhere
+    TEMPLATE_INDEX_TTL = float(os.environ.get("TEMPLATE_INDEX_TTL", "300"))
+    SEARCH_QUERY_CONCURRENCY = int(os.environ.get("SEARCH_QUERY_CONCURRENCY", "8"))
+    # Whole-contract clause fetches, 0 bytes disables the cache
+    CLAUSE_CACHE_MAX_BYTES = int(os.environ.get("CLAUSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CLAUSE_CACHE_MAX_ENTRIES = int(os.environ.get("CLAUSE_CACHE_MAX_ENTRIES", "256"))
+    CLAUSE_CACHE_TTL = float(os.environ.get("CLAUSE_CACHE_TTL", "300"))
+    # Seconds after a write during which fetches of the document are not cached, the index
+    # only makes writes searchable after a short delay
+    CLAUSE_CACHE_SETTLE_SECONDS = float(os.environ.get("CLAUSE_CACHE_SETTLE_SECONDS", "5"))
+
+    # Search Upload Configuration, a request to the index may not exceed 16 MB
+    SEARCH_UPLOAD_MAX_BYTES = int(os.environ.get("SEARCH_UPLOAD_MAX_BYTES", str(12 * 1024 * 1024)))
+    SEARCH_UPLOAD_MAX_DOCUMENTS = int(os.environ.get("SEARCH_UPLOAD_MAX_DOCUMENTS", "1000"))
+    SEARCH_UPLOAD_CONCURRENCY = int(os.environ.get("SEARCH_UPLOAD_CONCURRENCY", "4"))
+    SEARCH_UPLOAD_MAX_RETRIES = int(os.environ.get("SEARCH_UPLOAD_MAX_RETRIES", "5"))
+    # Set to true to have the index return clause vectors in search results again
+    SEARCH_VECTORS_RETRIEVABLE = os.environ.get("SEARCH_VECTORS_RETRIEVABLE", "false").lower() == "true"
 
     # Embedding Configuration
     EMBED_DIM = int(os.environ.get("EMBED_DIM", "3072"))
+    EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MEMORY_SIZE = int(os.environ.get("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+    # Per-deployment request limits, 0 falls back to the defaults for the model
+    EMBEDDING_BATCH_TOKEN_LIMIT = int(os.environ.get("EMBEDDING_BATCH_TOKEN_LIMIT", "0"))
+    EMBEDDING_MAX_BATCH_SIZE = int(os.environ.get("EMBEDDING_MAX_BATCH_SIZE", "0"))
+    EMBEDDING_MAX_CONCURRENCY = int(os.environ.get("EMBEDDING_MAX_CONCURRENCY", "4"))
+    EMBEDDING_TOKENS_PER_MINUTE = int(os.environ.get("EMBEDDING_TOKENS_PER_MINUTE", "120000"))
+    EMBEDDING_REQUESTS_PER_MINUTE = int(os.environ.get("EMBEDDING_REQUESTS_PER_MINUTE", "720"))
+
+    # Ingestion Pipeline Configuration
+    STREAM_QUEUE_SIZE = int(os.environ.get("STREAM_QUEUE_SIZE", "64"))
+    STREAM_EMBED_BATCH_SIZE = int(os.environ.get("STREAM_EMBED_BATCH_SIZE", "16"))
+    BULK_DOCUMENT_CONCURRENCY = int(os.environ.get("BULK_DOCUMENT_CONCURRENCY", "8"))
+    BULK_PROCESS_WORKERS = int(os.environ.get("BULK_PROCESS_WORKERS", "0"))  # 0 uses one per CPU
+    BULK_CHECKPOINT_PATH = os.environ.get("BULK_CHECKPOINT_PATH", ".cache/bulk-ingestion.json")
+    # Sections longer than CLAUSE_MAX_TOKENS are indexed as overlapping child chunks of a parent clause
+    CLAUSE_MAX_TOKENS = int(os.environ.get("CLAUSE_MAX_TOKENS", "1024"))
+    CLAUSE_CHUNK_TOKENS = int(os.environ.get("CLAUSE_CHUNK_TOKENS", "512"))
+    CLAUSE_CHUNK_OVERLAP = int(os.environ.get("CLAUSE_CHUNK_OVERLAP", "64"))
+    
+    # Prompt Context Configuration, whole-contract context is packed into this many tokens
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "24000"))
+    CONTEXT_SUMMARY_TOKENS = int(os.environ.get("CONTEXT_SUMMARY_TOKENS", "96"))
+    
+    # Connection Pool Configuration
+    HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
     
     # Reference Location Configuration
     STOPWORDS_LEGAL_PATH = "reference/stopwords/legal.txt"
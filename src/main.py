@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 from typing import List
 
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from services.client_registry import client_registry
+from services.prompt_service import PromptyService
 # TODO: Add kernel_function import here
 
 # TODO: Add document_processor import here
@@ -20,6 +22,17 @@ load_dotenv()
 
 # TODO: Add CreateFileDownloadPlugin here
 
+@cl.on_app_startup
+async def on_app_startup():
+    """Open the shared service clients and parse the prompts once for the whole app."""
+    await client_registry.start()
+    PromptyService().preload()
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Close the shared service clients and their connection pools."""
+    await client_registry.close()
+
 @cl.on_chat_start
 async def on_chat_start():
     """Initialize the chat with an agent."""
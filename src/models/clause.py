@@ -1,40 +1,67 @@
-class Clause:
-    def __init__(self, id: str, doc_id: str, section_index: int, section: str, 
-                 text_full: str, text_clean: str, entity_type: str, 
-                 clause_type: str, is_template: bool):
-        self.id = id
-        self.doc_id = doc_id
-        self.section_index = section_index
-        self.section = section
-        self.text_full = text_full
-        self.text_clean = text_clean
-        self.entity_type = entity_type
-        self.clause_type = clause_type
-        self.is_template = is_template
+import hashlib
+from typing import NamedTuple, Optional
+
+
+class Clause(NamedTuple):
+    """One indexed clause of a contract or template.
+
+    Clauses are immutable tuples, built with a single tuple allocation; use
+    `_replace` to derive a changed copy. A clause takes about as much memory as
+    an instance of the previous plain class, most of it in the shared strings.
+    """
+    id: str
+    doc_id: str
+    section_index: int
+    section: str
+    text_full: str
+    text_clean: str
+    entity_type: str
+    clause_type: str
+    is_template: bool
+    # Pages of the source document the clause was read from, 0 when unknown
+    page_start: int = 0
+    page_end: int = 0
+    # Oversized sections are indexed as a parent clause with `chunk_count` child
+    # chunks, each child points back to its parent through `parent_id`
+    parent_id: Optional[str] = None
+    chunk_count: int = 0
+
+    @property
+    def is_chunk(self) -> bool:
+        return self.parent_id is not None
 
     @staticmethod
     def from_dict(data: dict) -> "Clause":
         return Clause(
-            id=data["id"],
-            doc_id=data["doc_id"],
-            section_index=data["section_index"],
-            section=data["section"],
-            text_full=data["text_full"],
-            text_clean=data["text_clean"],
-            entity_type=data.get("entity_type", ""),
-            clause_type=data.get("clause_type", ""),
-            is_template=data.get("is_template", False)
+            data["id"],
+            data["doc_id"],
+            data["section_index"],
+            data["section"],
+            data["text_full"],
+            data["text_clean"],
+            data.get("entity_type") or "",
+            data.get("clause_type") or "",
+            data.get("is_template") or False,
+            data.get("page_start") or 0,
+            data.get("page_end") or 0,
+            data.get("parent_id"),
+            data.get("chunk_count") or 0
         )
 
+    def content_hash(self) -> str:
+        """Hash of the indexed content, used to skip unchanged clauses.
+        
+        The position of the clause (section index and pages) is left out, so a
+        section that only moved because another one was inserted is not re-embedded.
+        """
+        content = "\0".join((
+            self.doc_id, self.section, self.text_full, self.text_clean, self.entity_type,
+            self.clause_type, str(self.is_template), self.parent_id or "", str(self.chunk_count)
+        ))
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
     def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "doc_id": self.doc_id,
-            "section_index": self.section_index,
-            "section": self.section,
-            "text_full": self.text_full,
-            "text_clean": self.text_clean,
-            "entity_type": self.entity_type,
-            "clause_type": self.clause_type,
-            "is_template": self.is_template
-        }
\ No newline at end of file
+        doc = self._asdict()
+        doc["content_hash"] = self.content_hash()
+        return doc
+
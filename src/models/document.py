@@ -3,10 +3,13 @@ import re
 from typing import IO, Optional
 
 class Page:
-    def __init__(self, page_num: int, offset: int, text: str):
+    def __init__(self, page_num: int, offset: int, text: str, 
+                 tables: Optional[list[str]] = None, figures: Optional[list[str]] = None):
         self.page_num = page_num
         self.offset = offset
         self.text = text
+        self.tables = tables or []
+        self.figures = figures or []
 
 class File:
     def __init__(self, content: IO, acls: Optional[dict[str, list]] = None, url: Optional[str] = None):
@@ -26,4 +29,26 @@ class File:
 
     def filename_to_id(self):
         filename_ascii = re.sub("[^0-9a-zA-Z_-]", "_", self.filename())
-        return f"file-{filename_ascii}"
\ No newline at end of file
+        return f"file-{filename_ascii}"
+
+class Section:
+    """A markdown section: the text under one header path, with where it came from.
+    
+    `page_content` and `metadata` ({"Header 1": ..., "Header 2": ...}) have the same
+    shape as the chunks of LangChain's MarkdownHeaderTextSplitter. `start` and `end`
+    are character offsets in the combined page text, `first_page` and `last_page`
+    the pages those offsets fall on.
+    """
+    def __init__(self, page_content: str, metadata: dict[str, str], start: int, end: int,
+                 first_page: int, last_page: int):
+        self.page_content = page_content
+        self.metadata = metadata
+        self.start = start
+        self.end = end
+        self.first_page = first_page
+        self.last_page = last_page
+
+    @property
+    def header_path(self) -> list[str]:
+        """Headers enclosing the section, outermost first."""
+        return list(self.metadata.values())
@@ -0,0 +1,202 @@
+"""Bulk ingestion of a whole directory of contracts.
+
+Document Intelligence parsing and embedding run as bounded async work, the
+CPU-bound splitting, cleaning and classification run in a process pool.
+Progress is checkpointed after every file, so an interrupted run picks up
+where it stopped when started again with the same checkpoint.
+
+Run from the src directory:
+    python -m processors.bulk_ingestion ../contracts --incremental
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional
+
+from models.clause import Clause
+from models.document import Page
+from processors.document_processor import DocumentProcessor, ProcessingStats
+from services.client_registry import client_registry
+from utils.tokens import count_tokens_batch
+from config.settings import config
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".doc", ".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".html"}
+
+# One processor per worker process, created by the pool initializer
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _init_worker() -> None:
+    global _worker_processor
+    _worker_processor = DocumentProcessor()
+
+
+def _build_clauses(pages: List[Page], filename: str) -> tuple[List[Clause], int]:
+    """Split, clean and classify a document in a worker process. Returns the clauses and their token count."""
+    clauses = _worker_processor.create_clauses_from_pages(pages, filename)
+    tokens = count_tokens_batch([clause.text_clean for clause in clauses], config.AZURE_OPENAI_MODEL_NAME)
+    return clauses, sum(tokens)
+
+
+class IngestionCheckpoint:
+    """JSON record of the files a bulk run has finished, keyed by path relative to the root."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    @staticmethod
+    def fingerprint(path: Path) -> dict:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_done(self, key: str, path: Path) -> bool:
+        entry = self.files.get(key)
+        return entry is not None and entry["fingerprint"] == self.fingerprint(path)
+
+    def mark_done(self, key: str, path: Path, stats: ProcessingStats) -> None:
+        self.files[key] = {"fingerprint": self.fingerprint(path), "stats": asdict(stats)}
+        self.save()
+
+    def save(self) -> None:
+        # Write to a temporary file first so a crash never leaves a truncated checkpoint
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+
+class BulkIngestion:
+    """Ingests every supported file below a directory with bounded concurrency."""
+
+    def __init__(
+        self,
+        processor: Optional[DocumentProcessor] = None,
+        checkpoint_path: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        incremental: bool = False
+    ):
+        self.processor = processor or DocumentProcessor()
+        self.checkpoint = IngestionCheckpoint(checkpoint_path or config.BULK_CHECKPOINT_PATH)
+        self.concurrency = concurrency or config.BULK_DOCUMENT_CONCURRENCY
+        self.process_workers = process_workers or config.BULK_PROCESS_WORKERS or os.cpu_count()
+        self.incremental = incremental
+        self.logger = logging.getLogger(__name__)
+
+    def find_files(self, root: Path) -> List[Path]:
+        """Return the supported files below root in a stable order."""
+        return sorted(
+            path for path in root.rglob("*")
+            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+
+    async def run(self, root: Path) -> List[ProcessingStats]:
+        """Ingest all files below root that are not already in the checkpoint."""
+        files = self.find_files(root)
+        pending = [
+            (path.relative_to(root).as_posix(), path) for path in files
+            if not self.checkpoint.is_done(path.relative_to(root).as_posix(), path)
+        ]
+        print(f"Found {len(files)} files, {len(files) - len(pending)} already ingested, {len(pending)} to go")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in pending:
+            queue.put_nowait(item)
+
+        results: List[ProcessingStats] = []
+        failures: List[str] = []
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        with ProcessPoolExecutor(max_workers=self.process_workers, initializer=_init_worker) as pool:
+            async def worker():
+                while not queue.empty():
+                    key, path = queue.get_nowait()
+                    try:
+                        stats = await self.ingest_file(path, key, pool, loop)
+                    except Exception as e:
+                        self.logger.error(f"Failed to ingest {key}: {e}")
+                        failures.append(key)
+                        continue
+                    self.checkpoint.mark_done(key, path, stats)
+                    results.append(stats)
+                    print(f"[{len(results) + len(failures)}/{len(pending)}] {key}: {stats.clauses_created} clauses")
+
+            async with asyncio.TaskGroup() as tg:
+                for _ in range(min(self.concurrency, len(pending))):
+                    tg.create_task(worker())
+
+        self.report(results, time.perf_counter() - started)
+        if failures:
+            print(f"{len(failures)} files failed and will be retried on the next run: {failures}")
+        return results
+
+    async def ingest_file(self, path: Path, doc_id: str, pool: ProcessPoolExecutor, loop) -> ProcessingStats:
+        """Parse a file, build its clauses in the process pool and index them."""
+        with open(path, "rb") as file:
+            pages = await self.processor._extract_pages(file, doc_id)
+
+        clauses, tokens = await loop.run_in_executor(pool, _build_clauses, pages, doc_id)
+
+        stats = self.processor._create_stats(doc_id, pages)
+        stats.total_tokens = tokens
+        # Chunks of oversized clauses are counted as part of their clause
+        await self.processor._index_clauses(
+            self.processor._group_clauses(clauses), doc_id, stats, self.incremental
+        )
+        return stats
+
+    def report(self, results: List[ProcessingStats], elapsed: float) -> None:
+        """Print aggregate throughput of the run."""
+        elapsed = max(elapsed, 1e-9)
+        clauses = sum(stats.clauses_created for stats in results)
+        tokens = sum(stats.total_tokens for stats in results)
+        pages = sum(stats.total_pages for stats in results)
+        print(f"Ingested {len(results)} documents ({pages} pages, {clauses} clauses, {tokens} tokens) in {elapsed:.1f}s")
+        print(f"  {len(results) / elapsed * 60:.1f} docs/min")
+        print(f"  {clauses / elapsed:.1f} clauses/sec")
+        print(f"  {tokens / elapsed:.1f} tokens/sec")
+        upload = self.processor.search_service.upload_stats()
+        print(
+            f"  {upload['requests']} upload requests, {upload['bytes_sent'] / 1024 / 1024:.1f} MB sent, "
+            f"{upload['retries']} documents retried"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Ingest every contract below a directory.")
+    parser.add_argument("directory", type=Path, help="Directory to walk for contract files")
+    parser.add_argument("--concurrency", type=int, default=None, help="Documents in flight at once")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for splitting and classification")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file used to resume an interrupted run")
+    parser.add_argument("--incremental", action="store_true", help="Only re-index clauses that changed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    ingestion = BulkIngestion(
+        checkpoint_path=args.checkpoint,
+        concurrency=args.concurrency,
+        process_workers=args.workers,
+        incremental=args.incremental
+    )
+    ingestion.processor.search_service.create_index_if_needed()
+
+    await client_registry.start()
+    try:
+        await ingestion.run(args.directory)
+    finally:
+        await client_registry.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
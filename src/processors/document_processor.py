@@ -1,22 +1,33 @@
+import asyncio
+import hashlib
 import json
 import logging
+import re
+import time
+from collections import Counter
 from pathlib import Path
-from typing import BinaryIO, List, Optional, AsyncGenerator
+from typing import BinaryIO, List, Optional, AsyncGenerator, AsyncIterator
 from dataclasses import dataclass
 
-from langchain.text_splitter import MarkdownHeaderTextSplitter
-
-from models.document import File
+from models.document import File, Page, Section
 from models.clause import Clause
 from services.document_intelligence import DocumentIntelligenceService
 from services.document_service import DocumentService
 from services.embedding_service import EmbeddingService
 from services.prompt_service import PromptyService
 from services.search_service import SearchService
-from utils.text_processing import load_stopwords, clean_text
-from utils.clause_classifier import classify_clause_heading
+from services.template_index import TemplateIndex
+from utils.text_processing import shared_stopwords, clean_texts
+from utils.clause_classifier import clause_classifier, classify_clause_headings
+from utils.markdown_sections import MarkdownSectionSplitter
+from utils.tokens import count_tokens, split_by_tokens
+from utils.context_packer import ContextPacker, PackedContext
+from utils.desired_terms import DesiredTermsIndex, shared_desired_terms
 from config.settings import config
 
+# Characters a search document key may not contain
+_KEY_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_\-=]+")
+
 
 @dataclass
 class ProcessingStats:
@@ -26,6 +37,11 @@ class ProcessingStats:
     total_characters: int
     total_chunks: int
     clauses_created: int
+    total_tokens: int = 0
+    clauses_added: int = 0
+    clauses_changed: int = 0
+    clauses_unchanged: int = 0
+    clauses_deleted: int = 0
 
 
 class DocumentProcessor:
@@ -54,7 +70,7 @@ class DocumentProcessor:
         self.prompt_service = prompt_service or PromptyService()
         self.document_service = document_service or DocumentService()
         self.logger = logging.getLogger(__name__)
-        
+
         # TODO: Initialize text splitter
                 
         # Load stopwords once during initialization
@@ -62,40 +78,86 @@ class DocumentProcessor:
                 
         # Load desired terms if configured
         self.desired_terms = self._load_desired_terms()
+        
+        self.context_packer = ContextPacker(
+            model_name=config.AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
+            max_tokens=config.CONTEXT_TOKEN_BUDGET,
+            summary_tokens=config.CONTEXT_SUMMARY_TOKENS
+        )
     
     def _load_stopwords(self) -> None:
-        """Load stopwords from configuration paths."""
+        """Load stopwords from configuration paths, shared by every processor in the process."""
         try:
-            self.stopwords = load_stopwords(
+            self.stopwords = shared_stopwords(
                 config.STOPWORDS_LEGAL_PATH, 
                 config.STOPWORDS_ENGLISH_PATH
             )
             self.logger.info(f"Loaded {len(self.stopwords)} stopwords")
         except Exception as e:
             self.logger.error(f"Failed to load stopwords: {e}")
-            self.stopwords = set()  # Fallback to empty set
+            self.stopwords = frozenset()  # Fallback to empty set
     
     def _load_desired_terms(self) -> str:
-        """Load desired terms file content as a single string."""
+        """Load desired terms file content as a single string, and its section index into desired_terms_index."""
+        self.desired_terms_index = DesiredTermsIndex("")
         try:
             desired_terms_path = getattr(config, "DESIRED_TERMS_PATH", None)
             if not desired_terms_path:
                 self.logger.warning("No DESIRED_TERMS_PATH configured")
                 return ""
-            with open(desired_terms_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            self.logger.info(f"Loaded desired terms file ({len(content)} characters)")
+            self.desired_terms_index = shared_desired_terms(desired_terms_path)
+            content = self.desired_terms_index.text
+            self.logger.info(
+                f"Loaded desired terms file ({len(content)} characters, "
+                f"{len(self.desired_terms_index)} sections)"
+            )
             return content
         except Exception as e:
             self.logger.error(f"Failed to load desired terms: {e}")
             return ""
+    
+    def desired_terms_for(self, clause_type: str) -> str:
+        """Return the desired terms sections that govern a clause type and the general ones, for per-clause prompts."""
+        return self.desired_terms_index.for_clause_type(clause_type)
 
-    async def process_file(self, file: BinaryIO, filename: str) -> ProcessingStats:
-        """Process a single file and return processing statistics.
+    async def pack_contract_context(self, doc_id: str, include_desired_terms: bool = False) -> PackedContext:
+        """Fetch an uploaded contract aligned with the template and pack it into the context token budget.
+        
+        Uploaded clauses are paired with the template clauses stored as their
+        alignment when the contract was indexed, see
+        SearchService.get_template_alignment, and the lowest-value text is
+        summarized or dropped until the context fits, see ContextPacker. Pass
+        include_desired_terms when the prompt does not already carry them; only
+        the sections governing the contract's clause types are added. Otherwise
+        the full desired terms the prompt carries count against the budget.
+        """
+        alignment, template = await asyncio.gather(
+            self.search_service.get_template_alignment(doc_id),
+            self.search_service.search_clauses_by_filter(TemplateIndex.FILTER),
+        )
+        desired_terms, max_tokens = "", None
+        if include_desired_terms:
+            desired_terms = self.desired_terms_index.for_clause_types(
+                {clause.clause_type for clause, _, _ in alignment} | {clause.clause_type for clause in template}
+            )
+        elif self.desired_terms:
+            prompt_tokens = count_tokens(self.desired_terms, self.context_packer.model_name)
+            max_tokens = max(self.context_packer.max_tokens - prompt_tokens, 0)
+        return self.context_packer.pack_contracts(alignment, template, desired_terms, max_tokens)
+
+    async def process_file(self, file: BinaryIO, filename: str, incremental: bool = False) -> ProcessingStats:
+        """Process a single file as a pipeline of overlapping stages and return processing statistics.
+        
+        Pages are split as they arrive, each clause is queued for embedding as soon
+        as its section is closed, and embedded batches are uploaded while later
+        sections are still being split. The stages are connected by bounded queues,
+        so only a window of the document is held in memory at any time.
         
         Args:
             file: Binary file object to process
             filename: Name of the file being processed
+            incremental: Only embed and upload clauses that are new or changed since
+                the file was last indexed, and delete clauses that no longer exist
             
         Returns:
             ProcessingStats object with processing details
@@ -104,55 +166,107 @@ class DocumentProcessor:
             Exception: If processing fails at any stage
         """
         self.logger.info(f"Starting processing: {filename}")
+        started = time.perf_counter()
+        
+        # Pages are counted as they arrive
+        stats = self._create_stats(filename, [])
         
         try:
             # TODO: Parse document into pages
             
-            # TODO: Combine all page text
-                        
             # TODO: Split into chunks and create clauses
-                        
-            await self._index_clauses(clauses)
-
-            stats = self._create_stats(filename, pages, full_text, [], clauses)
-            self.logger.info(f"Successfully processed {filename}: {stats.clauses_created} clauses indexed")
-            return stats
+            
+            await self._index_clauses(clauses, filename, stats, incremental)
             
         except Exception as e:
             self.logger.error(f"Failed to process {filename}: {e}")
             raise
+        
+        if not stats.clauses_created:
+            self.logger.warning(f"No clauses created for {filename}")
+        
+        self.logger.info(
+            f"Successfully processed {filename}: {stats.clauses_created} clauses indexed "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return stats
     
-    async def _extract_pages(self, file: BinaryIO, filename: str) -> List:
-        """Extract pages from document using document intelligence service."""
+    async def _stream_pages(self, file: BinaryIO, filename: str) -> AsyncGenerator[Page, None]:
+        """Yield pages from the document intelligence service as they are produced."""
         file_obj = File(content=file)
         
         try:
-            pages = [page async for page in self.doc_intelligence.parse_document(file_obj)]
-            
-            for page in pages:
+            async for page in self.doc_intelligence.parse_document(file_obj):
                 self.logger.debug(
                     f"Extracted page {page.page_num} with {len(page.text)} characters"
                 )
-            
-            return pages
-            
+                yield page
         finally:
             file_obj.close()
     
-    def _combine_page_text(self, pages: List) -> str:
-        """Combine text from all pages into a single string."""
-        full_text = "".join(page.text for page in pages)
-        self.logger.debug(f"Combined text length: {len(full_text)} characters")
-        return full_text
+    async def _stream_clauses(
+        self, 
+        pages: AsyncIterator[Page], 
+        filename: str, 
+        stats: ProcessingStats
+    ) -> AsyncGenerator[List[Clause], None]:
+        """Yield each clause, followed by its chunks, as soon as its section is closed.
+        
+        Pages are counted into stats as they arrive.
+        
+        Raises:
+            ValueError: if no pages were extracted
+        """
+        async def counted_pages():
+            async for page in pages:
+                stats.total_pages += 1
+                stats.total_characters += len(page.text)
+                yield page
+        
+        chunk_index, header_paths = 0, Counter()
+        async for chunk in self.markdown_splitter.split_pages_async(counted_pages()):
+            clause_id = self._clause_id(filename, chunk, header_paths)
+            text_clean = self._clean_texts([chunk.page_content])[0]
+            clause = self._create_single_clause(chunk, chunk_index, filename, clause_id, text_clean)
+            chunk_index += 1
+            yield self._split_oversized(clause)
+        
+        if not stats.total_pages:
+            raise ValueError(f"No pages extracted from {filename}")
+    
+    @staticmethod
+    async def _group_clauses(clauses: List[Clause]) -> AsyncGenerator[List[Clause], None]:
+        """Yield the clauses of a list one by one, each followed by its chunks, for _index_clauses."""
+        group = []
+        for clause in clauses:
+            if group and not clause.is_chunk:
+                yield group
+                group = []
+            group.append(clause)
+        if group:
+            yield group
+    
+    async def _extract_pages(self, file: BinaryIO, filename: str) -> List[Page]:
+        """Extract all pages of a document, for callers that split it in one go."""
+        return [page async for page in self._stream_pages(file, filename)]
     
-    async def _create_clauses(self, full_text: str, filename: str) -> List[Clause]:
-        """Split text into chunks and create Clause objects."""
-        chunks = self.markdown_splitter.split_text(full_text)
-        clauses = []
+    def create_clauses_from_pages(self, pages: List[Page], filename: str) -> List[Clause]:
+        """Split pages into chunks and create Clause objects that record the pages they came from.
         
-        for chunk_index, chunk in enumerate(chunks):
-            clause = self._create_single_clause(chunk, chunk_index, filename)
-            clauses.append(clause)
+        This is pure CPU work, so bulk ingestion runs it in a worker process.
+        """
+        chunks = list(self.markdown_splitter.split_pages(pages))
+        clauses, header_paths = [], Counter()
+        
+        # Clean and classify the whole document in one batch each, repeated headings only once
+        texts_clean = self._clean_texts([chunk.page_content for chunk in chunks])
+        clause_types = classify_clause_headings(
+            [self._extract_section_header(chunk.metadata) for chunk in chunks], ""
+        )
+        for chunk_index, (chunk, text_clean, clause_type) in enumerate(zip(chunks, texts_clean, clause_types)):
+            clause_id = self._clause_id(filename, chunk, header_paths)
+            clause = self._create_single_clause(chunk, chunk_index, filename, clause_id, text_clean, clause_type)
+            clauses.extend(self._split_oversized(clause))
             
             self.logger.debug(
                 f"Created clause {chunk_index} for {filename}: "
@@ -161,17 +275,22 @@ class DocumentProcessor:
         
         return clauses
     
-    def _create_single_clause(self, chunk, chunk_index: int, filename: str) -> Clause:
-        """Create a single Clause object from a text chunk."""
+    def _create_single_clause(
+        self, 
+        chunk: Section, 
+        chunk_index: int, 
+        filename: str, 
+        clause_id: str, 
+        text_clean: str, 
+        clause_type: Optional[str] = None
+    ) -> Clause:
+        """Create a single Clause object from a text chunk, classifying its heading unless clause_type is given."""
         # Get the most specific header available
         section_header = self._extract_section_header(chunk.metadata)
         
         # Classify the clause type
-        clause_type = classify_clause_heading(section_header, "")
-        
-        # Create unique ID for this clause
-        file_id = Path(filename).stem  # Remove extension for cleaner ID
-        clause_id = f"{file_id}_{chunk_index}"
+        if clause_type is None:
+            clause_type = clause_classifier.classify(section_header, "")
         
         return Clause(
             id=clause_id,
@@ -179,12 +298,62 @@ class DocumentProcessor:
             section_index=chunk_index,
             section=section_header,
             text_full=chunk.page_content,
-            # TODO: populate clean text property
+            text_clean=text_clean,
             entity_type="clause" if clause_type else "",
             clause_type=clause_type or "",
-            is_template=self._is_template_file(filename)
+            is_template=self._is_template_file(filename),
+            page_start=chunk.first_page,
+            page_end=chunk.last_page
         )
     
+    def _clean_texts(self, texts: List[str]) -> List[str]:
+        """Remove the stopwords from clause texts, all of them in one pass."""
+        # TODO: Remove stopwords from the texts
+        
+        return texts
+    
+    def _clause_id(self, filename: str, chunk: Section, header_paths: Counter) -> str:
+        """Return a unique id for the clause of a section, derived from its headers rather than its position.
+        
+        Inserting or removing a section leaves the ids of the others alone, so an
+        incremental re-index only touches the sections that changed. Sections with
+        the same header path are told apart by their order; header_paths counts
+        the paths seen so far in the document.
+        """
+        header_path = "\0".join(chunk.header_path)
+        occurrence = header_paths[header_path]
+        header_paths[header_path] += 1
+        digest = hashlib.sha1(header_path.encode("utf-8")).hexdigest()[:12]
+        suffix = f"-{occurrence}" if occurrence else ""
+        return f"{self._document_key(filename)}_{digest}{suffix}"
+    
+    def _split_oversized(self, clause: Clause) -> List[Clause]:
+        """Split a clause whose clean text is over CLAUSE_MAX_TOKENS into overlapping child chunks.
+        
+        Returns the clause itself when it is small enough, otherwise the parent
+        clause (full text, with its chunk count) followed by its children. The
+        children share the parent's section, type and pages; searches score them
+        and answer with the parent.
+        """
+        model_name = self.embedding_service.model_name
+        if count_tokens(clause.text_clean, model_name) <= config.CLAUSE_MAX_TOKENS:
+            return [clause]
+        
+        windows = split_by_tokens(
+            clause.text_full, model_name, config.CLAUSE_CHUNK_TOKENS, config.CLAUSE_CHUNK_OVERLAP
+        )
+        children = [
+            clause._replace(
+                id=f"{clause.id}_part{part}",
+                text_full=window,
+                text_clean=window_clean,
+                parent_id=clause.id
+            )
+            for part, (window, window_clean) in enumerate(zip(windows, self._clean_texts(windows)))
+        ]
+        self.logger.debug(f"Split clause {clause.id} into {len(children)} chunks")
+        return [clause._replace(chunk_count=len(children))] + children
+    
     def _extract_section_header(self, metadata: dict) -> str:
         """Extract the most specific header from chunk metadata."""
         return (
@@ -192,38 +361,194 @@ class DocumentProcessor:
             "Unknown"
         )
     
+    @staticmethod
+    def _document_key(filename: str) -> str:
+        """Return the key-safe prefix of the clause ids of a document.
+        
+        The doc_id may be a relative path, so files with the same name in
+        different folders get a short hash of the full doc_id next to their
+        readable file name.
+        """
+        stem = _KEY_UNSAFE_RE.sub("-", Path(filename).stem).strip("-") or "doc"
+        digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:8]
+        return f"{stem}-{digest}"
+    
     def _is_template_file(self, filename: str) -> bool:
-        """Check if filename indicates this is a template file."""
-        return "template" in filename.lower()
+        """Check if the file name (not the folders of its path) indicates a template file."""
+        return "template" in Path(filename).name.lower()
     
-    async def _index_clauses(self, clauses: List[Clause]) -> None:
-        """Create embeddings for clauses and upload to search index."""
-        # Extract clean text for embedding generation
-        texts = [clause.text_clean for clause in clauses]
+    async def _index_clauses(
+        self, 
+        clauses: AsyncIterator[List[Clause]], 
+        doc_id: str, 
+        stats: ProcessingStats, 
+        incremental: bool = False
+    ) -> None:
+        """Create embeddings for clauses and upload them to the search index as they arrive.
+        
+        Each item of clauses is a clause followed by its chunks. Queuing, embedding
+        and uploading run as concurrent stages, so the first batches are searchable
+        while later clauses are still being produced. The clause counts are added
+        to stats.
+        
+        In incremental mode the content hash of each clause is compared with the hash
+        stored in the search index for the same clause id. Clause ids follow the
+        section headers, so this pairs each section with its previous version
+        wherever it moved. Only new and changed clauses are embedded and uploaded,
+        unchanged ones only get their new position, and clauses of the previous
+        version that no longer exist are deleted.
+        """
+        existing_hashes = await self.search_service.get_clause_hashes(doc_id) if incremental else None
+        unchanged: List[Clause] = []
+        # Template files are small; their clauses are kept to refresh the local template index
+        template_clauses = [] if self._is_template_file(doc_id) else None
+        
+        clause_queue: asyncio.Queue = asyncio.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+        upload_queue: asyncio.Queue = asyncio.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+        started = time.perf_counter()
+        
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._queue_stage(clauses, clause_queue, stats, existing_hashes, unchanged))
+                tg.create_task(self._embed_stage(clause_queue, upload_queue))
+                tg.create_task(self._upload_stage(upload_queue, started, template_clauses))
+        except* Exception as eg:
+            raise eg.exceptions[0]
+        
+        # Whatever is left belonged to sections the new version no longer has
+        stale_ids = list(existing_hashes or ())
+        if stale_ids:
+            await self.search_service.delete_clauses(stale_ids, doc_id)
+        stats.clauses_deleted = len(stale_ids)
         
-        # Create embeddings
-        # TODO create embeddings
+        if unchanged and (stats.clauses_added or stats.clauses_changed or stale_ids):
+            # Sections after an inserted, removed or edited one may have moved
+            await self.search_service.update_clause_positions(unchanged)
         
-        # Upload to search index
-        # TODO upload to search index
+        # Keep the local template index in step with re-ingested templates
+        if template_clauses is not None and (template_clauses or stale_ids):
+            if unchanged:
+                # Unchanged template clauses are served from the embedding cache
+                embeddings = await self.embedding_service.create_clause_embeddings(unchanged)
+                template_clauses.extend(zip(unchanged, embeddings))
+            await self._refresh_template(
+                doc_id,
+                [clause for clause, _ in template_clauses],
+                [embedding for _, embedding in template_clauses],
+            )
         
-        self.logger.info(f"Successfully indexed {len(clauses)} clauses")
+        if incremental:
+            self.logger.info(
+                f"Incrementally indexed {doc_id}: {stats.clauses_added} added, {stats.clauses_changed} changed, "
+                f"{stats.clauses_unchanged} unchanged, {stats.clauses_deleted} deleted"
+            )
     
-    def _create_stats(
+    async def _queue_stage(
         self, 
-        filename: str, 
-        pages: List, 
-        full_text: str, 
-        chunks: List, 
-        clauses: List[Clause]
-    ) -> ProcessingStats:
-        """Create processing statistics object."""
+        clauses: AsyncIterator[List[Clause]], 
+        clause_queue: asyncio.Queue, 
+        stats: ProcessingStats, 
+        existing_hashes: Optional[dict] = None, 
+        unchanged: Optional[List[Clause]] = None
+    ) -> None:
+        """Queue each clause with its chunks for embedding, skipping clauses indexed unchanged."""
+        async for parts in clauses:
+            stats.total_chunks += 1
+            stats.clauses_created += 1
+            if existing_hashes is not None:
+                stored = [existing_hashes.pop(clause.id, None) for clause in parts]
+                if all(h == clause.content_hash() for h, clause in zip(stored, parts)):
+                    stats.clauses_unchanged += 1
+                    unchanged.extend(parts)
+                    continue
+                if stored[0] is not None:
+                    stats.clauses_changed += 1
+                else:
+                    stats.clauses_added += 1
+            else:
+                stats.clauses_added += 1
+            # A clause and its chunks are queued together so they are embedded in one batch
+            await clause_queue.put(parts)
+        
+        await clause_queue.put(None)
+    
+    async def _embed_stage(self, clause_queue: asyncio.Queue, upload_queue: asyncio.Queue) -> None:
+        """Embed queued clauses in batches and pass them on for upload."""
+        done = False
+        while not done:
+            # Wait for the next clause, then take whatever else is ready up to a full batch
+            clauses = []
+            parts = await clause_queue.get()
+            while parts is not None:
+                clauses.extend(parts)
+                if len(clauses) >= config.STREAM_EMBED_BATCH_SIZE or clause_queue.empty():
+                    break
+                parts = clause_queue.get_nowait()
+            done = parts is None
+            
+            if clauses:
+                # Create embeddings from the clean text of the clauses
+                # TODO create embeddings
+                
+                await upload_queue.put((clauses, embeddings))
+        
+        await upload_queue.put(None)
+    
+    async def _upload_stage(
+        self, 
+        upload_queue: asyncio.Queue, 
+        started: float, 
+        template_clauses: Optional[list] = None
+    ) -> None:
+        """Upload embedded clause batches to the search index as they arrive."""
+        first = True
+        while (item := await upload_queue.get()) is not None:
+            clauses, embeddings = item
+            # Upload to search index
+            # TODO upload to search index
+            
+            if template_clauses is not None:
+                template_clauses.extend(zip(clauses, embeddings))
+            else:
+                await self._align_with_template(clauses, embeddings)
+            
+            if first:
+                self.logger.info(
+                    f"First clauses searchable after {time.perf_counter() - started:.2f}s"
+                )
+                first = False
+    
+    async def _refresh_template(self, doc_id: str, clauses: List[Clause], embeddings) -> None:
+        """Bring the local template index and the stored alignments in step with a re-indexed template."""
+        self.search_service.refresh_template_index(doc_id, clauses, embeddings)
+        # Stored matches may point at template clause ids that now hold other sections
+        await self.search_service.clear_template_alignments()
+    
+    async def _align_with_template(self, clauses: List[Clause], embeddings) -> None:
+        """Store the best matching template clause of each whole clause of a contract.
+        
+        Comparing a contract with the template then reads the stored pairs with
+        SearchService.get_template_alignment instead of searching clause by clause.
+        """
+        rows = [i for i, clause in enumerate(clauses) if not clause.is_template and not clause.is_chunk]
+        if not rows:
+            return
+        
+        alignments = await self.search_service.align_to_template(
+            [clauses[i] for i in rows], embeddings[rows]
+        )
+        if alignments:
+            await self.search_service.upload_alignments(alignments)
+            self.logger.debug(f"Aligned {len(alignments)} clauses with the template")
+    
+    def _create_stats(self, filename: str, pages: List[Page]) -> ProcessingStats:
+        """Create the processing statistics of a document, its clause counts are added while indexing."""
         return ProcessingStats(
             filename=filename,
             total_pages=len(pages),
-            total_characters=len(full_text),
-            total_chunks=len(chunks),
-            clauses_created=len(clauses)
+            total_characters=sum(len(page.text) for page in pages),
+            total_chunks=0,
+            clauses_created=0
         )
 
 
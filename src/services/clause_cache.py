@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional
+
+from models.clause import Clause
+from config.settings import config
+
+
+class ClauseCache:
+    """In-process cache of whole-contract clause fetches, keyed by search filter.
+
+    Each entry is the ordered clause list one filter returned, so repeated
+    fetches of the same contract or template skip the paged search requests.
+    Entries are evicted least recently used first once the cache is over
+    `max_bytes` (estimated from the clause text) or `max_entries`, and expire
+    after `ttl_seconds` to pick up writes made by other processes.
+
+    Writes through the search service invalidate the entries of the documents
+    they touch, together with every entry whose filter is not a single-document
+    filter, since a write may change which clauses such a filter matches. A
+    fetch that was in flight during an invalidation is returned but not cached.
+    Neither is a fetch that started less than `settle_seconds` after such a
+    write: the search index makes writes visible only after a short delay, so
+    it may still have read the contract partly or wholly as it was before.
+    """
+
+    # Rough per-clause overhead of the tuple, its small fields and the list slot
+    CLAUSE_OVERHEAD_BYTES = 400
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        settle_seconds: Optional[float] = None
+    ):
+        self.max_bytes = config.CLAUSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_entries = config.CLAUSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_seconds = config.CLAUSE_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self.settle_seconds = config.CLAUSE_CACHE_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        # filter -> (expires, doc_id or None, size, clauses)
+        self._entries: OrderedDict[str, tuple[float, Optional[str], int, tuple[Clause, ...]]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._generation = 0
+        # doc_id -> time of its last invalidation, None -> time of the last invalidation of any document
+        self._written: dict[Optional[str], float] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    async def get_or_load(
+        self,
+        filter: str,
+        loader: Callable[[], Awaitable[list[Clause]]],
+        doc_id: Optional[str] = None
+    ) -> list[Clause]:
+        """Return the clauses for a filter, loading them at most once for concurrent misses.
+
+        Pass the doc_id when the filter matches exactly one document, so writes to
+        other documents leave the entry in place.
+        """
+        if not self.enabled:
+            return await loader()
+
+        entry = self._entries.get(filter)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(filter)
+                self.hits += 1
+                return list(entry[3])
+            self._remove(filter)
+
+        in_flight = self._in_flight.get(filter)
+        if in_flight is not None:
+            self.coalesced += 1
+            # Shield so a cancelled waiter does not cancel the load for everyone else
+            return list(await asyncio.shield(in_flight))
+
+        self.misses += 1
+        generation = self._generation
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[filter] = future
+        try:
+            clauses = tuple(await loader())
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._in_flight[filter]
+
+        future.set_result(clauses)
+        # Clauses read while a write was going on, or before it was searchable, may be stale
+        if generation == self._generation and not self._recently_written(doc_id, started):
+            self._store(filter, doc_id, clauses)
+        return list(clauses)
+
+    def get(self, filter: str) -> Optional[list[Clause]]:
+        """Return the cached clauses for a filter without loading them, or None."""
+        entry = self._entries.get(filter) if self.enabled else None
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        self._entries.move_to_end(filter)
+        self.hits += 1
+        return list(entry[3])
+
+    def invalidate_documents(self, doc_ids: Iterable[str]) -> None:
+        """Drop the entries a write to the given documents may have changed."""
+        doc_ids = set(doc_ids)
+        self._generation += 1
+        now = time.monotonic()
+        self._written = {
+            written_id: written for written_id, written in self._written.items()
+            if now - written < self.settle_seconds
+        }
+        self._written[None] = now
+        for written_id in doc_ids:
+            self._written[written_id] = now
+        for filter, (_, doc_id, _, _) in list(self._entries.items()):
+            if doc_id is None or doc_id in doc_ids:
+                self._remove(filter)
+                self.invalidations += 1
+
+    def _recently_written(self, doc_id: Optional[str], started: float) -> bool:
+        """Whether a fetch started at `started` may not see the last write to the document yet."""
+        # A filter over many documents is affected by a write to any of them
+        written = self._written.get(doc_id)
+        return written is not None and started - written < self.settle_seconds
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.bytes = 0
+
+    def _store(self, filter: str, doc_id: Optional[str], clauses: tuple[Clause, ...]) -> None:
+        size = self.estimate_size(clauses)
+        if size > self.max_bytes:
+            return
+
+        if filter in self._entries:
+            self._remove(filter)
+        self._entries[filter] = (time.monotonic() + self.ttl_seconds, doc_id, size, clauses)
+        self.bytes += size
+        while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, filter: str) -> None:
+        self.bytes -= self._entries.pop(filter)[2]
+
+    @classmethod
+    def estimate_size(cls, clauses: Iterable[Clause]) -> int:
+        """Estimate the memory held by clauses, dominated by their text."""
+        return sum(
+            len(clause.text_full) + len(clause.text_clean) + len(clause.section) + cls.CLAUSE_OVERHEAD_BYTES
+            for clause in clauses
+        )
+
+    def stats(self) -> dict:
+        """Return hit/miss, invalidation and size counters for monitoring."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
@@ -0,0 +1,133 @@
+import asyncio
+import contextlib
+from typing import Optional
+
+import aiohttp
+import httpx
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.search.documents.aio import SearchClient
+from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+
+from config.settings import config
+
+
+class ClientRegistry:
+    """Long-lived Azure OpenAI and Azure Search clients shared by every service.
+    
+    Clients are created on first use (or by `start` at application startup) on
+    top of keep-alive connection pools, and are closed once by `close` at
+    shutdown. Services borrow them and must not close them.
+    """
+
+    def __init__(
+        self, 
+        max_connections: Optional[int] = None, 
+        max_keepalive_connections: Optional[int] = None, 
+        keepalive_expiry: Optional[float] = None
+    ):
+        self.max_connections = max_connections or config.HTTP_MAX_CONNECTIONS
+        self.max_keepalive_connections = max_keepalive_connections or config.HTTP_MAX_KEEPALIVE_CONNECTIONS
+        self.keepalive_expiry = keepalive_expiry or config.HTTP_KEEPALIVE_EXPIRY
+        # Closes of clients left behind by a previous event loop, kept referenced until done
+        self._closing: set[asyncio.Task] = set()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._openai_client: Optional[AsyncAzureOpenAI] = None
+        self._search_clients: dict[str, SearchClient] = {}
+        self._search_session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Create the shared clients up front so the first request does not pay for it."""
+        self.get_openai_client()
+        self.get_search_client(config.AZURE_SEARCH_INDEX_NAME)
+
+    async def close(self) -> None:
+        """Close every shared client and its connection pool."""
+        await self._close_clients(self._openai_client, list(self._search_clients.values()), self._search_session)
+        self._reset()
+
+    @staticmethod
+    async def _close_clients(
+        openai_client: Optional[AsyncAzureOpenAI],
+        search_clients: list[SearchClient],
+        search_session: Optional[aiohttp.ClientSession]
+    ) -> None:
+        clients = [openai_client, *search_clients, search_session]
+        for client in clients:
+            if client is None:
+                continue
+            # One failed close must not leave the remaining pools open
+            with contextlib.suppress(Exception):
+                await client.close()
+
+    def get_openai_client(self) -> AsyncAzureOpenAI:
+        """Return the shared Azure OpenAI client for the embedding deployment."""
+        self._check_loop()
+        if self._openai_client is None:
+            self._openai_client = AsyncAzureOpenAI(
+                azure_endpoint=config.AZURE_OPENAI_ENDPOINT,
+                azure_deployment=config.AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
+                api_version="2024-06-01",
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry,
+                    )
+                ),
+            )
+        return self._openai_client
+
+    def get_search_client(self, index_name: str) -> SearchClient:
+        """Return the shared search client for an index, all indexes share one connection pool."""
+        self._check_loop()
+        search_client = self._search_clients.get(index_name)
+        if search_client is None:
+            if self._search_session is None:
+                self._search_session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=self.max_connections,
+                        keepalive_timeout=self.keepalive_expiry,
+                    )
+                )
+            search_client = SearchClient(
+                endpoint=config.AZURE_SEARCH_ENDPOINT,
+                index_name=index_name,
+                credential=config.search_credential,
+                transport=AioHttpTransport(session=self._search_session, session_owner=False),
+            )
+            self._search_clients[index_name] = search_client
+        return search_client
+
+    def _check_loop(self) -> None:
+        # Connection pools belong to the event loop that created them. A new loop
+        # (e.g. a second asyncio.run in a script) starts over with fresh clients.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                self._close_stale(self._loop, loop)
+            self._reset()
+            self._loop = loop
+
+    def _close_stale(self, old_loop: asyncio.AbstractEventLoop, loop: asyncio.AbstractEventLoop) -> None:
+        """Close the clients of a previous event loop instead of leaking their connections."""
+        if self._openai_client is None and not self._search_clients and self._search_session is None:
+            return
+
+        closing = self._close_clients(self._openai_client, list(self._search_clients.values()), self._search_session)
+        if old_loop.is_running():
+            # Still serving in another thread: close on the loop that owns the connections
+            asyncio.run_coroutine_threadsafe(closing, old_loop)
+            return
+
+        # The old loop is stopped or closed. Closing here still marks the pools closed and
+        # releases the sockets; transports of a closed loop may fail to shut down cleanly,
+        # which _close_clients tolerates.
+        task = loop.create_task(closing)
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+client_registry = ClientRegistry()
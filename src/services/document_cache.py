@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from models.document import Page
+from config.settings import config
+
+
+class DocumentIntelligenceCache:
+    """Content-addressed on-disk cache of analyzed document pages.
+    
+    Entries are keyed by a hash of the file bytes and the analysis options and
+    stored as gzip-compressed JSON. Each hit refreshes the entry's modification
+    time, and the least recently used entries are evicted once the directory
+    grows past `max_bytes`.
+    """
+
+    FILE_SUFFIX = ".json.gz"
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory or config.DOCUMENT_INTELLIGENCE_CACHE_DIR)
+        self.max_bytes = config.DOCUMENT_INTELLIGENCE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(content: bytes, model_id: str, output_format: str, variant: str = "") -> str:
+        """Return the cache key for a file and the options it is analyzed with."""
+        digest = hashlib.sha256()
+        for part in (model_id, output_format, variant):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(content)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[list[Page]]:
+        """Return the cached pages for key, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entries = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return [
+            Page(page_num=page_num, offset=offset, text=text, tables=tables, figures=figures)
+            for page_num, offset, text, tables, figures in entries
+        ]
+
+    def put(self, key: str, pages: list[Page]) -> None:
+        """Store the pages for key and evict old entries if the cache is over its size cap."""
+        if not self.enabled:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = [[p.page_num, p.offset, p.text, p.tables, p.figures] for p in pages]
+
+        # Write to a temporary file first so readers never see a partial entry
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entries, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.FILE_SUFFIX}"
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.glob(f"*{self.FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total_bytes -= size
+            except OSError:
+                pass
@@ -1,9 +1,11 @@
-from collections.abc import AsyncGenerator
+from bisect import bisect_right
+from collections.abc import AsyncGenerator, Iterator
 from enum import Enum
-from typing import Union
+from typing import Optional
 from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
 from azure.ai.documentintelligence.models import AnalyzeResult
 from models.document import Page, File
+from services.document_cache import DocumentIntelligenceCache
 from config.settings import config
 
 class ObjectType(Enum):
@@ -12,16 +14,36 @@ class ObjectType(Enum):
     FIGURE = 1
 
 class DocumentIntelligenceService:
-    def __init__(self):
+    def __init__(
+        self, 
+        masked_objects: Optional[set[ObjectType]] = None, 
+        cache: Optional[DocumentIntelligenceCache] = None
+    ):
         self.endpoint = f"https://{config.AZURE_DOCUMENTINTELLIGENCE_SERVICE}.cognitiveservices.azure.com"
         self.credential = config.document_intelligence_credential
+        # Tables stay in the page text by default, figures only carry OCR noise for clauses
+        self.masked_objects = masked_objects if masked_objects is not None else {ObjectType.FIGURE}
+        self.cache = cache or DocumentIntelligenceCache()
 
     async def parse_document(self, file: File) -> AsyncGenerator[Page, None]:
-        print(f"Extracting text from '{file.content.name}' using Azure Document Intelligence")
         model_id = "prebuilt-layout"
+        output_format = "markdown"
         
         content_bytes = file.content.read()
         
+        # The masked objects change the page text, so they are part of the cache key too
+        masked = ",".join(sorted(o.name for o in self.masked_objects))
+        cache_key = self.cache.make_key(content_bytes, model_id, output_format, masked)
+        cached_pages = self.cache.get(cache_key)
+        if cached_pages is not None:
+            print(f"Loaded {len(cached_pages)} analyzed pages for '{file.content.name}' from cache")
+            for pg in cached_pages:
+                yield pg
+            return
+        
+        print(f"Extracting text from '{file.content.name}' using Azure Document Intelligence")
+        pages: list[Page] = []
+        
         async with DocumentIntelligenceClient(
             endpoint=self.endpoint, 
             credential=self.credential
@@ -30,31 +52,95 @@ class DocumentIntelligenceService:
                 model_id=model_id,
                 body=content_bytes,
                 content_type="application/octet-stream",
-                output_content_format="markdown"
+                output_content_format=output_format
             )
 
             analyze_result: AnalyzeResult = await poller.result()
             print("Document analysis completed successfully")
             print(f"Analyzed document with {len(analyze_result.pages)} pages")
             
-            offset = 0
-            for page in analyze_result.pages:
-                page_offset = page.spans[0].offset
-                page_length = page.spans[0].length
-                mask_chars: list[tuple[ObjectType, Union[int, None]]] = [
-                    (ObjectType.NONE, None)
-                ] * page_length
-                                
-                page_text = ""
-                for idx, mask_char in enumerate(mask_chars):
-                    object_type, object_idx = mask_char
-                    if object_type == ObjectType.NONE:
-                        page_text += analyze_result.content[page_offset + idx]
+            for pg in self.extract_pages(analyze_result):
+                pages.append(pg)
+                yield pg
+        
+        self.cache.put(cache_key, pages)
+
+    def extract_pages(self, analyze_result: AnalyzeResult) -> Iterator[Page]:
+        """Yield the pages of an analysis result, slicing page text straight out of its spans.
+        
+        Tables and figures are located by their span offsets. Object types in
+        `masked_objects` are cut out of the page text, and every object is also
+        emitted on its own through `Page.tables` and `Page.figures`.
+        """
+        content = analyze_result.content
+        objects = self._object_spans(analyze_result)
+        object_starts = [start for start, _, _, _ in objects]
+        
+        offset = 0
+        for page in analyze_result.pages:
+            parts: list[str] = []
+            tables: list[str] = []
+            figures: list[str] = []
+            
+            for span in page.spans:
+                cursor = span.offset
+                span_end = span.offset + span.length
+                # Step back one in case an object starting before this span still overlaps it
+                idx = max(bisect_right(object_starts, cursor) - 1, 0)
                 
-                # Clean up the page text
-                page_text = page_text.replace("<!-- PageBreak -->", "")
-                page_text = page_text.strip()
+                while idx < len(objects) and objects[idx][0] < span_end:
+                    start, end, object_type, object_text = objects[idx]
+                    idx += 1
+                    if end <= cursor:
+                        continue
+                    
+                    parts.append(content[cursor:max(start, cursor)])
+                    if object_type not in self.masked_objects:
+                        parts.append(content[max(start, cursor):min(end, span_end)])
+                    if object_text is not None and start >= span.offset:
+                        # Emit each object once, on the page where it starts
+                        (tables if object_type == ObjectType.TABLE else figures).append(object_text)
+                    cursor = min(end, span_end)
                 
-                pg = Page(page_num=page.page_number, offset=offset, text=page_text)
-                yield pg
-                offset += len(page_text)
+                parts.append(content[cursor:span_end])
+            
+            # Clean up the page text
+            page_text = "".join(parts)
+            page_text = page_text.replace("<!-- PageBreak -->", "")
+            page_text = page_text.strip()
+            
+            yield Page(
+                page_num=page.page_number, 
+                offset=offset, 
+                text=page_text, 
+                tables=tables, 
+                figures=figures
+            )
+            offset += len(page_text)
+
+    @staticmethod
+    def _object_spans(analyze_result: AnalyzeResult) -> list[tuple[int, int, ObjectType, Optional[str]]]:
+        """Return (start, end, type, text) for every table and figure span, ordered by offset.
+        
+        The object text is only set on the first span of each object.
+        """
+        content = analyze_result.content
+        objects = []
+        for object_type, items in (
+            (ObjectType.TABLE, analyze_result.tables or []),
+            (ObjectType.FIGURE, analyze_result.figures or []),
+        ):
+            for item in items:
+                object_text = "".join(
+                    content[span.offset:span.offset + span.length] for span in item.spans
+                )
+                for span_idx, span in enumerate(item.spans):
+                    objects.append((
+                        span.offset, 
+                        span.offset + span.length, 
+                        object_type, 
+                        object_text if span_idx == 0 else None
+                    ))
+        
+        objects.sort(key=lambda o: o[0])
+        return objects
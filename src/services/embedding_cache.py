@@ -0,0 +1,129 @@
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from config.settings import config
+
+
+class EmbeddingCache:
+    """Two-level embedding cache: an in-memory LRU in front of a local SQLite store.
+    
+    Entries are keyed by (model_name, dimensions, sha256(text)) and vectors are
+    stored as float32 blobs. Hit and miss counters are kept so the saved
+    embedding calls can be reported.
+    """
+
+    # Keep IN (...) lookups well under SQLite's bound parameter limit
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, path: Optional[str] = None, memory_size: Optional[int] = None):
+        self.path = config.EMBEDDING_CACHE_PATH if path is None else path
+        self.memory_size = config.EMBEDDING_CACHE_MEMORY_SIZE if memory_size is None else memory_size
+        self._memory: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._connection: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, dimensions: int, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """Return the cached float32 embedding for each text, or None where there is no entry."""
+        keys = [(model_name, dimensions, self.text_hash(text)) for text in texts]
+        results: list[Optional[np.ndarray]] = [None] * len(texts)
+
+        pending: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                results[i] = vector
+                self.memory_hits += 1
+            else:
+                pending.setdefault(key[2], []).append(i)
+
+        for text_hash, vector in self._load(model_name, dimensions, list(pending)):
+            for i in pending.pop(text_hash):
+                results[i] = vector
+                self.disk_hits += 1
+            self._remember((model_name, dimensions, text_hash), vector)
+
+        self.misses += sum(len(indices) for indices in pending.values())
+        return results
+
+    def put_many(self, model_name: str, dimensions: int, texts: list[str], embeddings: np.ndarray) -> None:
+        """Store embeddings for texts, one row per text, in memory and on disk."""
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            text_hash = self.text_hash(text)
+            # Copy so a cached row does not keep the caller's whole matrix alive
+            vector = np.array(embedding, dtype=np.float32)
+            self._remember((model_name, dimensions, text_hash), vector)
+            rows.append((model_name, dimensions, text_hash, vector.tobytes()))
+
+        connection = self._connect()
+        if connection is not None and rows:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model_name, dimensions, text_hash, vector) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for monitoring."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _remember(self, key: tuple, vector: np.ndarray) -> None:
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _load(self, model_name: str, dimensions: int, text_hashes: list[str]):
+        connection = self._connect()
+        if connection is None:
+            return
+        for start in range(0, len(text_hashes), self.LOOKUP_CHUNK_SIZE):
+            chunk = text_hashes[start:start + self.LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT text_hash, vector FROM embeddings "
+                f"WHERE model_name = ? AND dimensions = ? AND text_hash IN ({placeholders})",
+                (model_name, dimensions, *chunk),
+            ).fetchall()
+            for text_hash, blob in rows:
+                yield text_hash, np.frombuffer(blob, dtype=np.float32)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model_name TEXT NOT NULL, dimensions INTEGER NOT NULL, text_hash TEXT NOT NULL, "
+                "vector BLOB NOT NULL, PRIMARY KEY (model_name, dimensions, text_hash))"
+            )
+        return self._connection
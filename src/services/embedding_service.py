@@ -1,5 +1,8 @@
-from typing import TypedDict
-import tiktoken
+import asyncio
+import base64
+from typing import Optional, TypedDict
+
+import numpy as np
 from tenacity import (
     AsyncRetrying,
     retry_if_exception_type,
@@ -7,12 +10,19 @@ from tenacity import (
     wait_random_exponential,
 )
 from openai import AsyncAzureOpenAI, RateLimitError
+from models.clause import Clause
+from services.client_registry import ClientRegistry, client_registry
+from services.embedding_cache import EmbeddingCache
+from services.rate_limiter import AdaptiveRateLimiter
+from utils.tokens import count_tokens, count_tokens_batch, split_by_tokens
 from config.settings import config
 
 class EmbeddingBatch:
-    def __init__(self, texts: list[str], token_length: int):
+    def __init__(self, texts: list[str], token_length: int, indices: Optional[list[int]] = None):
         self.texts = texts
         self.token_length = token_length
+        # Positions of texts in the input list, batches are not necessarily contiguous
+        self.indices = indices if indices is not None else list(range(len(texts)))
 
 SUPPORTED_BATCH_AOAI_MODEL = {
     "text-embedding-ada-002": {"token_limit": 8100, "max_batch_size": 16},
@@ -21,86 +31,224 @@ SUPPORTED_BATCH_AOAI_MODEL = {
 }
 
 class EmbeddingService:
-    def __init__(self):
+    def __init__(
+        self, 
+        cache: Optional[EmbeddingCache] = None, 
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        clients: Optional[ClientRegistry] = None
+    ):
+        self.clients = clients or client_registry
         self.model_name = config.AZURE_OPENAI_MODEL_NAME
         self.dimensions = config.EMBED_DIM
+        self.cache = cache or EmbeddingCache()
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(
+            tokens_per_minute=config.EMBEDDING_TOKENS_PER_MINUTE,
+            requests_per_minute=config.EMBEDDING_REQUESTS_PER_MINUTE,
+        )
+        self.max_concurrency = config.EMBEDDING_MAX_CONCURRENCY
 
     def calculate_token_length(self, text: str) -> int:
-        encoding = tiktoken.encoding_for_model(self.model_name)
-        return len(encoding.encode(text))
-
-    async def create_client(self) -> AsyncAzureOpenAI:
-        return AsyncAzureOpenAI(
-            azure_endpoint=config.AZURE_OPENAI_ENDPOINT,
-            azure_deployment=config.AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
-            api_version="2024-06-01"
-        )
+        return count_tokens(text, self.model_name)
 
-    def split_text_into_batches(self, texts: list[str]) -> list[EmbeddingBatch]:
+    def get_batch_limits(self) -> tuple[int, int]:
+        """Return (token_limit, max_batch_size) for the deployment, applying any configured overrides."""
         batch_info = SUPPORTED_BATCH_AOAI_MODEL.get(self.model_name)
-        if not batch_info:
+        if not batch_info and not (
+            config.EMBEDDING_BATCH_TOKEN_LIMIT and config.EMBEDDING_MAX_BATCH_SIZE
+        ):
             raise NotImplementedError(
                 f"Model {self.model_name} is not supported with batch embedding operations"
             )
+        batch_info = batch_info or {}
+        return (
+            config.EMBEDDING_BATCH_TOKEN_LIMIT or batch_info["token_limit"],
+            config.EMBEDDING_MAX_BATCH_SIZE or batch_info["max_batch_size"],
+        )
 
-        batch_token_limit = batch_info["token_limit"]
-        batch_max_size = batch_info["max_batch_size"]
+    def get_client(self) -> AsyncAzureOpenAI:
+        """Borrow the shared Azure OpenAI client, it is closed by the registry at shutdown."""
+        return self.clients.get_openai_client()
+
+    def split_text_into_batches(self, texts: list[str]) -> list[EmbeddingBatch]:
+        """Pack texts into as few requests as possible under the deployment's limits.
+        
+        Token counts come from one batched encode call. Texts are then sorted by
+        length and each batch is opened with the longest remaining text and topped
+        up with the shortest ones, so long clauses are spread over batches instead
+        of leaving many requests half-empty. A text over the token limit still gets
+        a batch of its own, `split_oversized_texts` keeps such texts from reaching here.
+        """
+        batch_token_limit, batch_max_size = self.get_batch_limits()
+        token_lengths = count_tokens_batch(texts, self.model_name)
+        order = sorted(range(len(texts)), key=lambda i: token_lengths[i], reverse=True)
+        
         batches: list[EmbeddingBatch] = []
-        batch: list[str] = []
-        batch_token_length = 0
+        longest, shortest = 0, len(order) - 1
+        while longest <= shortest:
+            indices = [order[longest]]
+            batch_token_length = token_lengths[order[longest]]
+            longest += 1
+            
+            while (
+                longest <= shortest
+                and len(indices) < batch_max_size
+                and batch_token_length + token_lengths[order[shortest]] <= batch_token_limit
+            ):
+                indices.append(order[shortest])
+                batch_token_length += token_lengths[order[shortest]]
+                shortest -= 1
+            
+            batches.append(EmbeddingBatch([texts[i] for i in indices], batch_token_length, indices))
         
-        for text in texts:
-            text_token_length = self.calculate_token_length(text)
-            if batch_token_length + text_token_length >= batch_token_limit and len(batch) > 0:
-                batches.append(EmbeddingBatch(batch, batch_token_length))
-                batch = []
-                batch_token_length = 0
-
-            batch.append(text)
-            batch_token_length = batch_token_length + text_token_length
-            if len(batch) == batch_max_size:
-                batches.append(EmbeddingBatch(batch, batch_token_length))
-                batch = []
-                batch_token_length = 0
-
-        if len(batch) > 0:
-            batches.append(EmbeddingBatch(batch, batch_token_length))
-
         return batches
 
     def before_retry_sleep(self, retry_state):
         print("Rate limited on the OpenAI embeddings API, sleeping before retrying...")
 
-    async def create_embedding_batch(self, texts: list[str], dimensions: int) -> list[list[float]]:
-        batches = self.split_text_into_batches(texts)
-        embeddings = []
-        client = await self.create_client()
+    @staticmethod
+    def get_retry_after(error: RateLimitError) -> Optional[float]:
+        """Return the wait in seconds requested by a 429 response, if it sent one."""
+        headers = error.response.headers if error.response is not None else {}
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
+    async def create_embedding_batch(self, texts: list[str], dimensions: int) -> np.ndarray:
+        """Return the embeddings of texts as one (len(texts), dimensions) float32 matrix."""
+        embeddings = np.empty((len(texts), dimensions), dtype=np.float32)
+        missing = []
+        for i, cached in enumerate(self.cache.get_many(self.model_name, dimensions, texts)):
+            if cached is None:
+                missing.append(i)
+            else:
+                embeddings[i] = cached
         
-        for batch in batches:
-            async for attempt in AsyncRetrying(
-                retry=retry_if_exception_type(RateLimitError),
-                wait=wait_random_exponential(min=15, max=60),
-                stop=stop_after_attempt(15),
-                before_sleep=self.before_retry_sleep,
-            ):
-                with attempt:
-                    emb_response = await client.embeddings.create(
-                        model=self.model_name, 
-                        input=batch.texts, 
-                        dimensions=dimensions
-                    )
-                    embeddings.extend([data.embedding for data in emb_response.data])
-                    print(
-                        f"Computed embeddings in batch. Batch size: {len(batch.texts)}, "
-                        f"Token count: {batch.token_length}"
-                    )
+        if missing:
+            # Identical texts (shared boilerplate clauses) only need to be embedded once
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            computed = await self._request_embeddings(missing_texts, dimensions)
+            self.cache.put_many(self.model_name, dimensions, missing_texts, computed)
+            
+            row_by_text = {text: row for row, text in enumerate(missing_texts)}
+            embeddings[missing] = computed[[row_by_text[texts[i]] for i in missing]]
+        
+        print(
+            f"Embeddings ready for {len(texts)} texts, "
+            f"{len(texts) - len(missing)} served from cache"
+        )
+        return embeddings
 
+    @staticmethod
+    def decode_embedding(embedding: str) -> np.ndarray:
+        """Decode a base64 embedding from the API into a float32 vector without building a float list."""
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+
+    def split_oversized_texts(self, texts: list[str]) -> tuple[list[str], Optional[list[int]]]:
+        """Split texts the API would reject for length into windows under the token limit.
+        
+        Returns the texts to send and, when anything was split, the input position
+        each of them belongs to.
+        """
+        token_limit, _ = self.get_batch_limits()
+        token_lengths = count_tokens_batch(texts, self.model_name)
+        if max(token_lengths, default=0) <= token_limit:
+            return texts, None
+        
+        windows, owners = [], []
+        for i, (text, token_length) in enumerate(zip(texts, token_lengths)):
+            parts = split_by_tokens(text, self.model_name, token_limit) if token_length > token_limit else [text]
+            windows.extend(parts)
+            owners.extend([i] * len(parts))
+        return windows, owners
+
+    async def _request_embeddings(self, texts: list[str], dimensions: int) -> np.ndarray:
+        windows, owners = self.split_oversized_texts(texts)
+        if owners is None:
+            return await self._request_window_embeddings(texts, dimensions)
+        
+        # An oversized text gets the length-weighted mean of its window embeddings, renormalized
+        window_embeddings = await self._request_window_embeddings(windows, dimensions)
+        weights = np.fromiter((len(window) for window in windows), dtype=np.float32, count=len(windows))
+        embeddings = np.zeros((len(texts), dimensions), dtype=np.float32)
+        np.add.at(embeddings, owners, window_embeddings * weights[:, np.newaxis])
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms == 0, 1, norms)
         return embeddings
 
-    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+    async def _request_window_embeddings(self, texts: list[str], dimensions: int) -> np.ndarray:
+        batches = self.split_text_into_batches(texts)
+        client = self.get_client()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        embeddings = np.empty((len(texts), dimensions), dtype=np.float32)
+        
+        async def embed_batch(batch: EmbeddingBatch) -> None:
+            async with semaphore:
+                # The shared limiter paces requests, so retries only need a short jittered wait
+                async for attempt in AsyncRetrying(
+                    retry=retry_if_exception_type(RateLimitError),
+                    wait=wait_random_exponential(multiplier=0.5, max=10),
+                    stop=stop_after_attempt(15),
+                    before_sleep=self.before_retry_sleep,
+                ):
+                    with attempt:
+                        await self.rate_limiter.acquire(batch.token_length)
+                        try:
+                            emb_response = await client.embeddings.create(
+                                model=self.model_name, 
+                                input=batch.texts, 
+                                dimensions=dimensions,
+                                encoding_format="base64"
+                            )
+                        except RateLimitError as e:
+                            self.rate_limiter.on_rate_limited(self.get_retry_after(e))
+                            raise
+                        self.rate_limiter.on_success()
+                        print(
+                            f"Computed embeddings in batch. Batch size: {len(batch.texts)}, "
+                            f"Token count: {batch.token_length}"
+                        )
+                        # Write each embedding straight into the row of its text
+                        for i, data in zip(batch.indices, emb_response.data):
+                            embeddings[i] = self.decode_embedding(data.embedding)
+        
+        await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        return embeddings
+
+    async def create_embeddings(self, texts: list[str]) -> np.ndarray:
         return await self.create_embedding_batch(texts, self.dimensions)
+
+    async def create_clause_embeddings(self, clauses: list[Clause]) -> np.ndarray:
+        """Embed the clean text of clauses for indexing, one row per clause.
+        
+        A clause split into chunks is searched through its chunks, so its own text
+        is not sent to the API. Its row is the normalized mean of the embeddings of
+        its chunks in the same list, used to align it with the template, or zeros
+        when none of them are.
+        """
+        rows = [i for i, clause in enumerate(clauses) if not clause.chunk_count]
+        embeddings = np.zeros((len(clauses), self.dimensions), dtype=np.float32)
+        if rows:
+            embeddings[rows] = await self.create_embeddings([clauses[i].text_clean for i in rows])
+        
+        chunk_rows: dict[str, list[int]] = {}
+        for i, clause in enumerate(clauses):
+            if clause.is_chunk:
+                chunk_rows.setdefault(clause.parent_id, []).append(i)
+        for i, clause in enumerate(clauses):
+            if clause.chunk_count and clause.id in chunk_rows:
+                mean = embeddings[chunk_rows[clause.id]].mean(axis=0)
+                embeddings[i] = mean / (np.linalg.norm(mean) or 1)
+        return embeddings
     
-    async def compute_text_embedding(self, q: str):
+    async def compute_text_embedding(self, q: str) -> np.ndarray:
+        cached = self.cache.get_many(self.model_name, self.dimensions, [q])[0]
+        if cached is not None:
+            return cached
         
         class ExtraArgs(TypedDict, total=False):
             dimensions: int
@@ -108,10 +256,23 @@ class EmbeddingService:
         dimensions_args: ExtraArgs = (
             {"dimensions": self.dimensions}
         )
-        client = await self.create_client()
-        embedding = await client.embeddings.create(
-            model=self.model_name,
-            input=q,
-            **dimensions_args,
-        )
-        return embedding.data[0].embedding
\ No newline at end of file
+        client = self.get_client()
+        await self.rate_limiter.acquire(self.calculate_token_length(q))
+        try:
+            embedding = await client.embeddings.create(
+                model=self.model_name,
+                input=q,
+                encoding_format="base64",
+                **dimensions_args,
+            )
+        except RateLimitError as e:
+            self.rate_limiter.on_rate_limited(self.get_retry_after(e))
+            raise
+        self.rate_limiter.on_success()
+        vector = self.decode_embedding(embedding.data[0].embedding)
+        self.cache.put_many(self.model_name, self.dimensions, [q], vector[np.newaxis])
+        return vector
+
+    def cache_stats(self) -> dict:
+        """Return embedding cache hit/miss counters."""
+        return self.cache.stats()
\ No newline at end of file
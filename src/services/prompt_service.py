@@ -1,22 +1,129 @@
+import copy
 import json
 import pathlib
+import threading
+from typing import Any, Callable, Optional
+
 import prompty
+from jinja2 import DictLoader, Environment, Template
+from prompty.core import param_hoisting
+from prompty.invoker import InvokerFactory
 
 from openai.types.chat import ChatCompletionMessageParam
 
+class PromptCache:
+    """Process-wide cache of parsed prompts and tool definitions.
+
+    Entries are keyed by file path and reused for as long as the file's
+    modification time is unchanged, so editing a prompt takes effect on the
+    next load without a restart. Jinja2 prompts are compiled once per version
+    of the file; rendering them again only evaluates the compiled template.
+    """
+
+    def __init__(self):
+        # path -> (mtime_ns, value, compiled template or None)
+        self._entries: dict[pathlib.Path, tuple[int, Any, Optional[Template]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: pathlib.Path, loader: Callable[[pathlib.Path], Any], compile: bool = False) -> Any:
+        """Return the cached value for a file, loading it again if the file changed."""
+        path = path.resolve()
+        mtime = path.stat().st_mtime_ns
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == mtime:
+            self.hits += 1
+            return entry[1]
+
+        value = loader(path)
+        template = self._compile(value) if compile else None
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = (mtime, value, template)
+        return value
+
+    def template_for(self, prompt) -> Optional[Template]:
+        """Return the compiled template of a prompt loaded through the cache, if it has one."""
+        file = getattr(prompt, "file", None)
+        entry = self._entries.get(pathlib.Path(file).resolve()) if file else None
+        if entry is None or entry[1] is not prompt:
+            return None
+        return entry[2]
+
+    @staticmethod
+    def _compile(prompt) -> Optional[Template]:
+        if prompt.template.type != "jinja2":
+            return None
+
+        # Same template set as prompty's Jinja2 renderer: the prompt and the prompts it is based on
+        templates, current = {}, prompt
+        while current:
+            if isinstance(current.content, str):
+                templates[pathlib.Path(current.file).name] = current.content
+            current = current.basePrompty
+        return Environment(loader=DictLoader(templates)).get_template(pathlib.Path(prompt.file).name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+prompt_cache = PromptCache()
+
+
 class PromptyService:
 
     PROMPTS_DIRECTORY = pathlib.Path(__file__).parent.parent / "prompts"
 
+    def __init__(self, cache: Optional[PromptCache] = None):
+        self.cache = cache or prompt_cache
+
     def load_prompt(self, path: str):
-        return prompty.load(self.PROMPTS_DIRECTORY / path)
+        """Return the parsed prompt, shared by every caller until the file changes; do not modify it."""
+        return self.cache.get(self.PROMPTS_DIRECTORY / path, prompty.load, compile=True)
 
     def load_tools(self, path: str):
-        return json.loads(open(self.PROMPTS_DIRECTORY / path).read())
+        """Return the tool definitions of a JSON file, a copy the caller is free to modify."""
+        return copy.deepcopy(self.cache.get(self.PROMPTS_DIRECTORY / path, self._read_json))
+
+    @staticmethod
+    def _read_json(path: pathlib.Path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def preload(self) -> int:
+        """Parse every prompt in the prompts directory ahead of the first session, returns how many loaded."""
+        loaded = 0
+        for path in sorted(self.PROMPTS_DIRECTORY.glob("*.prompty")):
+            # Prompts still to be written in the labs are empty files
+            if not path.stat().st_size:
+                continue
+            try:
+                self.load_prompt(path.name)
+                loaded += 1
+            except Exception as e:
+                print(f"Failed to preload prompt {path.name}: {e}")
+        return loaded
 
     def render_prompt(self, prompt, data) -> list[ChatCompletionMessageParam]:
-        return prompty.prepare(prompt, data)
-    
+        template = self.cache.template_for(prompt)
+        if template is None:
+            return prompty.prepare(prompt, data)
+
+        rendered = template.render(**param_hoisting(data, prompt.sample))
+        return InvokerFactory.run_parser(prompt, rendered)
+
     def render_prompt_as_string(self, prompt, data) -> str:
         result = self.render_prompt(prompt, data)
-        return "\n".join([msg['content'] for msg in result if 'content' in msg and msg['content']])
\ No newline at end of file
+        return "\n".join([msg['content'] for msg in result if 'content' in msg and msg['content']])
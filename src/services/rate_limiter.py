@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class AdaptiveRateLimiter:
+    """Token-bucket limiter for a tokens-per-minute and requests-per-minute quota.
+    
+    Both buckets refill continuously. When the service still answers with a 429,
+    every caller is paused until the Retry-After time and the refill rate is
+    halved; each successful request then ramps the rate back up.
+    """
+
+    def __init__(
+        self, 
+        tokens_per_minute: int, 
+        requests_per_minute: int, 
+        min_rate_factor: float = 0.1, 
+        recovery_step: float = 0.05,
+        default_retry_after: float = 1.0
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.min_rate_factor = min_rate_factor
+        self.recovery_step = recovery_step
+        self.default_retry_after = default_retry_after
+        self.rate_factor = 1.0
+        self.throttled_count = 0
+        self._tokens = float(tokens_per_minute)
+        self._requests = float(requests_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request of the given token size fits in the quota."""
+        # A single request larger than the whole bucket could never fit, let it through on a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+        
+        # Waiters queue on the lock, so requests are admitted in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= tokens and self._requests >= 1:
+                        self._tokens -= tokens
+                        self._requests -= 1
+                        return
+                    wait = max(
+                        (tokens - self._tokens) / self._per_second(self.tokens_per_minute),
+                        (1 - self._requests) / self._per_second(self.requests_per_minute),
+                    )
+                await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        """Ramp the refill rate back up after a request went through."""
+        self.rate_factor = min(1.0, self.rate_factor + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Back off after a 429: pause until Retry-After and halve the refill rate."""
+        now = time.monotonic()
+        self._refill(now)
+        self.throttled_count += 1
+        self.rate_factor = max(self.min_rate_factor, self.rate_factor / 2)
+        self._paused_until = max(self._paused_until, now + (retry_after or self.default_retry_after))
+        self._tokens = 0.0
+        self._requests = 0.0
+
+    def _per_second(self, per_minute: int) -> float:
+        return per_minute * self.rate_factor / 60
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(
+            float(self.tokens_per_minute), 
+            self._tokens + elapsed * self._per_second(self.tokens_per_minute)
+        )
+        self._requests = min(
+            float(self.requests_per_minute), 
+            self._requests + elapsed * self._per_second(self.requests_per_minute)
+        )
@@ -1,3 +1,8 @@
+import asyncio
+import re
+from typing import Optional
+
+import numpy as np
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import *
 from azure.search.documents.aio import SearchClient
@@ -9,24 +14,89 @@ from azure.search.documents.models import (
 
 from models.clause import Clause
 from config.settings import config
+from services.client_registry import ClientRegistry, client_registry
+from services.clause_cache import ClauseCache
 from services.embedding_service import EmbeddingService
+from services.search_uploader import SearchUploader, UploadStats
+from services.template_index import TemplateIndex
+from utils.async_cache import AsyncTTLCache
 
 class SearchService:
     """Service for managing Azure Search index and performing search operations."""
-    def __init__(self, embedding_service: EmbeddingService):
+
+    # Everything Clause.from_dict reads, results never need the embeddings or content hash
+    CLAUSE_FIELDS = list(Clause._fields)
+    # Best template clause of each contract clause, written when the contract is indexed
+    ALIGNMENT_FIELDS = ["template_match_id", "template_match_score"]
+
+    DOC_FILTER_RE = re.compile(r"^\s*doc_id eq '((?:[^']|'')*)'\s*$")
+
+    def __init__(self, embedding_service: EmbeddingService, clients: Optional[ClientRegistry] = None):
+        self.clients = clients or client_registry
         self.endpoint = config.AZURE_SEARCH_ENDPOINT
         self.index_name = config.AZURE_SEARCH_INDEX_NAME
         self.credential = config.search_credential
         self.dimensions = config.EMBED_DIM
         self.embedding_service = embedding_service
+        self.query_vector_cache = AsyncTTLCache(
+            max_size=config.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_seconds=config.QUERY_EMBEDDING_CACHE_TTL,
+        )
+        self.template_index = TemplateIndex()
+        self._template_index_lock = asyncio.Lock()
+        self.upload_totals = UploadStats()
+        self.clause_cache = ClauseCache()
 
     def create_index_if_needed(self):
-        """Create the search index in Azure Search if it does not already exist."""
+        """Create the search index in Azure Search if it does not already exist.
+        
+        An existing index is migrated instead: fields added since it was created
+        are added to it, existing fields are left untouched.
+        """
         sic = SearchIndexClient(self.endpoint, self.credential)
         existing = [i.name for i in sic.list_indexes()]
         if self.index_name in existing:
+            self.update_index_schema(sic)
+            return
+
+        idx = SearchIndex(
+            name=self.index_name, 
+            fields=self._index_fields(), 
+            semantic_search=self._semantic_search(),
+            vector_search=self._vector_search()
+        )
+        sic.create_index(idx)
+
+    def update_index_schema(self, sic: Optional[SearchIndexClient] = None):
+        """Add any fields missing from an existing index and align the retrievability of its vectors.
+        
+        Whether a field is retrievable is the one attribute an existing field may
+        change in place, so indexes created with retrievable embeddings stop
+        returning them without being rebuilt.
+        """
+        sic = sic or SearchIndexClient(self.endpoint, self.credential)
+        index = sic.get_index(self.index_name)
+        wanted_fields = {field.name: field for field in self._index_fields()}
+        existing_fields = {field.name: field for field in index.fields}
+        missing_fields = [field for name, field in wanted_fields.items() if name not in existing_fields]
+        
+        changed_fields = []
+        for name, field in existing_fields.items():
+            wanted = wanted_fields.get(name)
+            if wanted is not None and bool(field.hidden) != bool(wanted.hidden):
+                field.hidden = wanted.hidden
+                changed_fields.append(name)
+        if not missing_fields and not changed_fields:
             return
+        
+        index.fields.extend(missing_fields)
+        sic.create_or_update_index(index)
+        if missing_fields:
+            print(f"Added fields {[field.name for field in missing_fields]} to index '{self.index_name}'")
+        if changed_fields:
+            print(f"Changed retrievability of fields {changed_fields} in index '{self.index_name}'")
 
+    def _index_fields(self) -> list[SearchField]:
         fields = [
             SimpleField(name="id", type=SearchFieldDataType.String, key=True),
             SimpleField(name="doc_id", type=SearchFieldDataType.String, filterable=True, facetable=True),
@@ -37,10 +107,19 @@ class SearchService:
             SimpleField(name="is_template", type=SearchFieldDataType.Boolean, filterable=True),
             SearchableField(name="text_full", type=SearchFieldDataType.String, analyzer_name="en.lucene"),
             SearchableField(name="text_clean", type=SearchFieldDataType.String, analyzer_name="en.lucene"),
+            SimpleField(name="content_hash", type=SearchFieldDataType.String),
+            SimpleField(name="page_start", type=SearchFieldDataType.Int32, filterable=True),
+            SimpleField(name="page_end", type=SearchFieldDataType.Int32, filterable=True),
+            SimpleField(name="parent_id", type=SearchFieldDataType.String, filterable=True),
+            SimpleField(name="chunk_count", type=SearchFieldDataType.Int32, filterable=True),
+            SimpleField(name="template_match_id", type=SearchFieldDataType.String, filterable=True),
+            SimpleField(name="template_match_score", type=SearchFieldDataType.Double, filterable=True, sortable=True),
             SearchField(
                 name="embeddings",
                 type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
                 searchable=True,
+                # Vectors are only searched, returning them would dwarf the rest of each result
+                hidden=not config.SEARCH_VECTORS_RETRIEVABLE,
                 filterable=False,
                 sortable=False,
                 facetable=False,
@@ -48,7 +127,9 @@ class SearchService:
                 vector_search_profile_name="embeddings-profile"
             ),
         ]
+        return fields
 
+    def _vector_search(self) -> VectorSearch:
         # Configure vectorizer
         text_vectorizer = AzureOpenAIVectorizer(
             vectorizer_name="embeddings-vectorizer",
@@ -86,133 +167,494 @@ class SearchService:
             vectorizer_name=text_vectorizer.vectorizer_name,
         )
 
-        vs = VectorSearch(
+        return VectorSearch(
             profiles=[text_vector_search_profile],
             algorithms=[text_vector_algorithm],
             compressions=[text_vector_compression],
             vectorizers=[text_vectorizer],
         )
 
-        idx = SearchIndex(
-            name=self.index_name, 
-            fields=fields, 
-            semantic_search=SemanticSearch(
-                default_configuration_name="default",
-                configurations=[
-                    SemanticConfiguration(
-                        name="default",
-                        prioritized_fields=SemanticPrioritizedFields(
-                            title_field=SemanticField(field_name="section"),
-                            content_fields=[SemanticField(field_name="text_clean")],
-                        ),
-                    )
-                ],
-            ),
-            vector_search=vs
+    def _semantic_search(self) -> SemanticSearch:
+        return SemanticSearch(
+            default_configuration_name="default",
+            configurations=[
+                SemanticConfiguration(
+                    name="default",
+                    prioritized_fields=SemanticPrioritizedFields(
+                        title_field=SemanticField(field_name="section"),
+                        content_fields=[SemanticField(field_name="text_clean")],
+                    ),
+                )
+            ],
         )
-        sic.create_index(idx)
 
-    def create_search_client(self) -> SearchClient:
-        """Create an asynchronous search client for the index."""
-        return SearchClient(
-            endpoint=self.endpoint, 
-            index_name=self.index_name, 
-            credential=self.credential
+    def get_search_client(self) -> SearchClient:
+        """Borrow the shared asynchronous search client for the index, it is closed by the registry at shutdown."""
+        return self.clients.get_search_client(self.index_name)
+
+    async def upload_clauses(
+        self, 
+        clauses: list[Clause], 
+        embeddings: np.ndarray, 
+        action: str = "upload"
+    ) -> UploadStats:
+        """Upload clauses with their embeddings to the search index.
+        
+        Batches are sized by their estimated payload and sent concurrently, and
+        clauses the service rejects with a transient status are retried. Pass
+        action="merge_or_upload" to update existing clauses in place. The float32
+        embedding rows are only turned into JSON lists batch by batch as they are sent.
+        Clauses split into chunks are uploaded without a vector, only their chunks
+        are scored.
+        
+        Cached whole-contract fetches of the affected documents are invalidated.
+        
+        Raises:
+            RuntimeError: if some clauses could still not be indexed after retrying
+        """
+        documents = []
+        for clause, embedding in zip(clauses, embeddings):
+            doc = clause.to_dict()
+            if not clause.chunk_count:
+                doc["embeddings"] = embedding
+            documents.append(doc)
+        
+        uploader = SearchUploader(self.get_search_client())
+        try:
+            stats = await uploader.upload(documents, action=action)
+        finally:
+            self.clause_cache.invalidate_documents({clause.doc_id for clause in clauses})
+        self.upload_totals.add(stats)
+        
+        print(
+            f"Uploaded {stats.succeeded}/{stats.documents} clauses in {stats.requests} requests "
+            f"({stats.docs_per_second:.1f} docs/sec, {stats.megabytes_per_second:.2f} MB/sec, "
+            f"{stats.retries} retried)"
         )
+        if stats.failed_keys:
+            raise RuntimeError(f"Failed to index {len(stats.failed_keys)} clauses: {stats.failed_keys}")
+        return stats
 
-    async def upload_clauses(self, clauses: list[Clause], embeddings: list[list[float]]):
-        """Upload clauses with their embeddings to the search index."""
-        MAX_BATCH_SIZE = 1000
-        clause_batches = [
-            clauses[i : i + MAX_BATCH_SIZE] 
-            for i in range(0, len(clauses), MAX_BATCH_SIZE)
+    async def update_clause_positions(self, clauses: list[Clause]) -> UploadStats:
+        """Merge the section index and pages of already indexed clauses, leaving their text and vectors alone.
+        
+        Cached whole-contract fetches of the affected documents are invalidated.
+        
+        Raises:
+            RuntimeError: if some positions could still not be stored after retrying
+        """
+        documents = [
+            {
+                "id": clause.id,
+                "section_index": clause.section_index,
+                "page_start": clause.page_start,
+                "page_end": clause.page_end,
+            }
+            for clause in clauses
         ]
+        uploader = SearchUploader(self.get_search_client())
+        try:
+            stats = await uploader.upload(documents, action="merge")
+        finally:
+            self.clause_cache.invalidate_documents({clause.doc_id for clause in clauses})
+        self.upload_totals.add(stats)
+        if stats.failed_keys:
+            raise RuntimeError(f"Failed to update {len(stats.failed_keys)} clause positions: {stats.failed_keys}")
+        return stats
 
-        async with self.create_search_client() as search_client:
-            for batch_index, batch in enumerate(clause_batches):
-                start_idx = batch_index * MAX_BATCH_SIZE
-                end_idx = start_idx + len(batch)
-                batch_embeddings = embeddings[start_idx:end_idx]
-                
-                documents = []
-                for i, clause in enumerate(batch):
-                    doc = clause.to_dict()
-                    doc["embeddings"] = batch_embeddings[i]
-                    documents.append(doc)
-                
-                await search_client.upload_documents(documents)
+    async def align_to_template(self, clauses: list[Clause], embeddings: np.ndarray) -> list[dict]:
+        """Match each clause with its most similar template clause.
+        
+        Returns one partial document per clause with the id and similarity of the
+        best template match, ready for upload_alignments. Returns nothing when no
+        template has been indexed.
+        """
+        await self.ensure_template_index()
+        if not len(self.template_index):
+            return []
+        
+        matches = self.template_index.align(embeddings, [clause.clause_type for clause in clauses])
+        return [
+            {"id": clause.id, "template_match_id": match.id, "template_match_score": score}
+            for clause, (match, score) in zip(clauses, matches)
+        ]
 
-    async def search_clauses_by_filter(self, filter: str) -> list[Clause]:
-        """Search for clauses matching a filter and return all results ordered by section index."""
-        async with self.create_search_client() as search_client:
-            results = await search_client.search(
-                search_text="*", 
-                filter=filter,
-                order_by=["section_index asc"],
+    async def upload_alignments(self, alignments: list[dict]) -> UploadStats:
+        """Merge template alignments into already indexed clauses.
+        
+        Raises:
+            RuntimeError: if some alignments could still not be stored after retrying
+        """
+        uploader = SearchUploader(self.get_search_client())
+        stats = await uploader.upload(alignments, action="merge")
+        self.upload_totals.add(stats)
+        if stats.failed_keys:
+            raise RuntimeError(f"Failed to store {len(stats.failed_keys)} template alignments: {stats.failed_keys}")
+        return stats
+
+    async def clear_template_alignments(self) -> int:
+        """Remove every stored template alignment, returns how many clauses had one.
+        
+        Called when a template is re-indexed: a template clause id may now hold an
+        edited section, or be gone, so stored matches could no longer be trusted.
+        get_template_alignment aligns the cleared clauses again on their next read.
+        """
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            search_text="*",
+            filter="template_match_id ne null",
+            select=["id"],
+        )
+        
+        cleared = []
+        async for page in results.by_page():
+            async for result in page:
+                cleared.append({"id": result["id"], "template_match_id": None, "template_match_score": None})
+        
+        if cleared:
+            await self.upload_alignments(cleared)
+            print(f"Cleared the template alignment of {len(cleared)} clauses")
+        return len(cleared)
+
+    async def get_template_alignment(self, doc_id: str) -> list[tuple[Clause, Optional[Clause], float]]:
+        """Return every clause of a document with its aligned template clause and similarity.
+        
+        The contract clauses and their stored alignments come from one paged fetch,
+        the template clauses from the clause cache. Clauses without a valid stored
+        alignment (indexed before the template, or cleared when it was re-indexed)
+        are aligned now and the result is stored; they are paired with None only
+        when no template is indexed.
+        """
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            search_text="*",
+            filter=self.whole_clauses_filter(self.doc_filter(doc_id)),
+            order_by=["section_index asc"],
+            select=self.CLAUSE_FIELDS + self.ALIGNMENT_FIELDS,
+        )
+        
+        rows = []
+        async for page in results.by_page():
+            async for result in page:
+                rows.append(result)
+        
+        templates = {
+            clause.id: clause for clause in await self.search_clauses_by_filter(TemplateIndex.FILTER)
+        }
+        clauses = [Clause.from_dict(row) for row in rows]
+        matches = [templates.get(row.get("template_match_id")) for row in rows]
+        scores = [row.get("template_match_score") or 0.0 for row in rows]
+        
+        missing = [i for i, clause in enumerate(clauses) if matches[i] is None and not clause.is_template]
+        if missing and templates:
+            # Stored clause embeddings are served from the embedding cache
+            embeddings = await self.embedding_service.create_embeddings(
+                [clauses[i].text_clean for i in missing]
             )
+            alignments = await self.align_to_template([clauses[i] for i in missing], embeddings)
+            if alignments:
+                await self.upload_alignments(alignments)
+            for i, alignment in zip(missing, alignments):
+                matches[i] = templates.get(alignment["template_match_id"])
+                scores[i] = alignment["template_match_score"]
+        
+        return list(zip(clauses, matches, scores))
 
-            clauses = [] 
+    async def get_clause_hashes(self, doc_id: str) -> dict[str, str]:
+        """Return the content hash of every indexed clause of a document, keyed by clause id."""
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            search_text="*",
+            filter=self.doc_filter(doc_id),
+            select=["id", "content_hash"],
+        )
 
-            async for page in results.by_page():
-                async for result in page:
-                    clauses.append(Clause.from_dict(result))
+        hashes = {}
+        async for page in results.by_page():
+            async for result in page:
+                hashes[result["id"]] = result.get("content_hash") or ""
+        return hashes
+
+    async def delete_clauses(self, clause_ids: list[str], doc_id: Optional[str] = None):
+        """Delete clauses from the search index by id.
+        
+        Pass the doc_id the clauses belong to so only that document's cached
+        fetches are invalidated, otherwise the whole clause cache is cleared.
+        """
+        MAX_BATCH_SIZE = 1000
+        search_client = self.get_search_client()
+        try:
+            for i in range(0, len(clause_ids), MAX_BATCH_SIZE):
+                await search_client.delete_documents(
+                    [{"id": clause_id} for clause_id in clause_ids[i : i + MAX_BATCH_SIZE]]
+                )
+        finally:
+            if doc_id is None:
+                self.clause_cache.clear()
+            else:
+                self.clause_cache.invalidate_documents([doc_id])
+
+    @staticmethod
+    def doc_filter(doc_id: str) -> str:
+        """Return an OData filter matching the clauses of one document."""
+        escaped = doc_id.replace("'", "''")
+        return f"doc_id eq '{escaped}'"
+
+    @classmethod
+    def filter_doc_id(cls, filter: str) -> Optional[str]:
+        """Return the document a `doc_id eq '...'` filter matches, None for any other filter."""
+        match = cls.DOC_FILTER_RE.match(filter)
+        return match.group(1).replace("''", "'") if match else None
+
+    @staticmethod
+    def whole_clauses_filter(filter: str) -> str:
+        """Restrict a filter to whole clauses, leaving out the chunks of oversized ones."""
+        return f"({filter}) and parent_id eq null"
+
+    @staticmethod
+    def scored_clauses_filter(filter: str) -> str:
+        """Restrict a filter to what ranked searches score: chunks instead of the clauses they were split from."""
+        # Clauses indexed before chunking have no chunk_count, `gt` is false for null
+        return f"({filter}) and not (chunk_count gt 0)"
+
+    async def resolve_parent(self, clause: Clause) -> Clause:
+        """Return the clause a chunk was split from, or the clause itself."""
+        if not clause.is_chunk:
+            return clause
+        if clause.is_template and self.template_index.loaded:
+            parent = self.template_index.get(clause.parent_id)
+            if parent is not None:
+                return parent
+        
+        search_client = self.get_search_client()
+        return Clause.from_dict(
+            await search_client.get_document(key=clause.parent_id, selected_fields=self.CLAUSE_FIELDS)
+        )
+
+    async def search_clauses_by_filter(self, filter: str) -> list[Clause]:
+        """Search for clauses matching a filter and return all results ordered by section index.
+        
+        Results are served from the clause cache until a write invalidates them.
+        """
+        return await self.clause_cache.get_or_load(
+            filter, lambda: self._fetch_clauses(filter), doc_id=self.filter_doc_id(filter)
+        )
+
+    async def _fetch_clauses(self, filter: str) -> list[Clause]:
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            search_text="*", 
+            filter=self.whole_clauses_filter(filter),
+            order_by=["section_index asc"],
+            select=self.CLAUSE_FIELDS,
+        )
+
+        clauses = [] 
+
+        async for page in results.by_page():
+            async for result in page:
+                clauses.append(Clause.from_dict(result))
                     
-            return clauses
+        return clauses
     
     async def search_single_clause_by_filter(self, filter: str) -> Clause | None:
         """Search for a single clause matching a filter."""
-        async with self.create_search_client() as search_client:
-            results = await search_client.search(
-                search_text="*",
-                filter=filter,
-                top=1,
-            )
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            search_text="*",
+            filter=self.whole_clauses_filter(filter),
+            top=1,
+            select=self.CLAUSE_FIELDS,
+        )
 
-            async for page in results.by_page():
-                async for result in page:
-                    return Clause.from_dict(result)
-            return None
+        async for page in results.by_page():
+            async for result in page:
+                return Clause.from_dict(result)
+        return None
 
-    async def search_single_hybrid(self, query: str, filter: str) -> Clause | None:
-        """Search for a single clause using hybrid search (semantic + vector)."""
-        vector_query = await self.create_vector_query(query)
+    async def search_many(self, queries: list[tuple[str, str]], semantic: bool = False) -> list[Clause | None]:
+        """Answer many (query, filter) searches at once, results in the order of the queries.
         
-        async with self.create_search_client() as search_client:
-            results = await search_client.search(
-                search_text=query,
-                filter=filter,
-                query_type=QueryType.SEMANTIC,
-                vector_queries=[vector_query],
-                top=1,
-                semantic_configuration_name="default",
-                semantic_query=query,
-            )
+        The query texts that are not cached are embedded together in one batched
+        request, then the searches run concurrently over the shared client, at most
+        SEARCH_QUERY_CONCURRENCY at a time. Each search behaves like
+        search_single_hybrid, or search_single_semantic when semantic is True.
+        """
+        vectors = await self.get_query_vectors([query for query, _ in queries])
+        search = self.search_single_semantic if semantic else self.search_single_hybrid
+        semaphore = asyncio.Semaphore(config.SEARCH_QUERY_CONCURRENCY)
+        
+        async def run(query: str, filter: str, query_vector: np.ndarray) -> Clause | None:
+            async with semaphore:
+                return await search(query, filter, query_vector)
+        
+        return await asyncio.gather(
+            *(run(query, filter, vector) for (query, filter), vector in zip(queries, vectors))
+        )
 
-            async for page in results.by_page():
-                async for result in page:
-                    return Clause.from_dict(result)
-            return None
+    async def search_single_hybrid(
+        self, 
+        query: str, 
+        filter: str, 
+        query_vector: Optional[np.ndarray] = None
+    ) -> Clause | None:
+        """Search for a single clause using hybrid search (semantic + vector).
+        
+        Oversized clauses are scored by their chunks, the clause a matching chunk
+        was split from is returned. Template lookups are answered from the local
+        template index when it is enabled.
+        """
+        if filter == TemplateIndex.FILTER and config.TEMPLATE_INDEX_ENABLED:
+            await self.ensure_template_index()
+            if len(self.template_index):
+                if query_vector is None:
+                    query_vector = await self.get_query_vector(query)
+                return self.template_index.search(query, query_vector, top=1)[0][0]
+        
+        return await self.search_remote_hybrid(query, filter, query_vector)
+
+    async def search_remote_hybrid(
+        self, 
+        query: str, 
+        filter: str, 
+        query_vector: Optional[np.ndarray] = None
+    ) -> Clause | None:
+        """Search for a single clause using hybrid search in the Azure Search index."""
+        vector_query = await self.create_vector_query(query, query_vector)
+        
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            search_text=query,
+            filter=self.scored_clauses_filter(filter),
+            query_type=QueryType.SEMANTIC,
+            vector_queries=[vector_query],
+            top=1,
+            semantic_configuration_name="default",
+            semantic_query=query,
+            select=self.CLAUSE_FIELDS,
+        )
+
+        async for page in results.by_page():
+            async for result in page:
+                return await self.resolve_parent(Clause.from_dict(result))
+        return None
+
+    async def search_single_semantic(
+        self, 
+        query: str, 
+        filter: str, 
+        query_vector: Optional[np.ndarray] = None
+    ) -> Clause | None:
+        """Search for a single clause using semantic search with vector fallback.
+        
+        Like search_single_hybrid, chunks are scored and their parent clause is returned.
+        """
+        vector_query = await self.create_vector_query(query, query_vector)
+        
+        search_client = self.get_search_client()
+        results = await search_client.search(
+            filter=self.scored_clauses_filter(filter),
+            query_type=QueryType.SEMANTIC,
+            vector_queries=[vector_query],
+            top=1,
+            semantic_configuration_name="default",
+            semantic_query=query,
+            select=self.CLAUSE_FIELDS,
+        )
 
-    async def search_single_semantic(self, query: str, filter: str) -> Clause | None:
-        """Search for a single clause using semantic search with vector fallback."""
-        vector_query = await self.create_vector_query(query)
+        async for page in results.by_page():
+            async for result in page:
+                return await self.resolve_parent(Clause.from_dict(result))
+        return None
         
-        async with self.create_search_client() as search_client:
+    async def create_vector_query(self, text: str, query_vector: Optional[np.ndarray] = None) -> VectorQuery:
+        """Create a vector query for the given text, embedding it unless its vector is given."""
+        if query_vector is None:
+            query_vector = await self.get_query_vector(text)
+        return VectorizedQuery(vector=query_vector.tolist(), k_nearest_neighbors=50, fields="embeddings")
+
+    async def get_query_vector(self, text: str) -> np.ndarray:
+        """Return the embedding of a query text.
+        
+        Query vectors are cached, and concurrent calls for the same text share a
+        single embedding request.
+        """
+        return await self.query_vector_cache.get_or_load(
+            text, lambda: self.embedding_service.compute_text_embedding(text)
+        )
+
+    async def get_query_vectors(self, texts: list[str]) -> list[np.ndarray]:
+        """Return the embeddings of many query texts, embedding the uncached ones in one batch."""
+        vectors = {}
+        for text in dict.fromkeys(texts):
+            cached = self.query_vector_cache.get(text)
+            if cached is not None:
+                vectors[text] = cached
+        
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            embeddings = await self.embedding_service.create_embeddings(missing)
+            for text, vector in zip(missing, embeddings):
+                self.query_vector_cache.set(text, vector)
+                vectors[text] = vector
+        return [vectors[text] for text in texts]
+
+    async def ensure_template_index(self) -> None:
+        """Load the local template index from the search index on first use.
+        
+        The index is reloaded once it is older than TEMPLATE_INDEX_TTL, and soon
+        after a load that found no templates, so templates indexed by another
+        process are picked up. Only the clause fields are fetched; the vectors are
+        not retrievable, so the template embeddings come from the embedding
+        service, which serves them from its cache when the templates were indexed
+        by this deployment.
+        """
+        if not self.template_index.is_stale(config.TEMPLATE_INDEX_TTL):
+            return
+        async with self._template_index_lock:
+            if not self.template_index.is_stale(config.TEMPLATE_INDEX_TTL):
+                return
+            
+            clauses = []
+            search_client = self.get_search_client()
             results = await search_client.search(
-                filter=filter,
-                query_type=QueryType.SEMANTIC,
-                vector_queries=[vector_query],
-                top=1,
-                semantic_configuration_name="default",
-                semantic_query=query,
+                search_text="*",
+                filter=TemplateIndex.FILTER,
+                order_by=["section_index asc"],
+                select=self.CLAUSE_FIELDS,
             )
-
             async for page in results.by_page():
                 async for result in page:
-                    return Clause.from_dict(result)
-            return None
-        
-    async def create_vector_query(self, text: str) -> VectorQuery:
-        """Create a vector query for the given text."""
-        query_vector = await self.embedding_service.compute_text_embedding(text)
-        return VectorizedQuery(vector=query_vector, k_nearest_neighbors=50, fields="embeddings")
\ No newline at end of file
+                    clauses.append(Clause.from_dict(result))
+            
+            embeddings = await self.embedding_service.create_clause_embeddings(clauses)
+            self.template_index.load(clauses, embeddings)
+            print(f"Loaded {len(clauses)} template clauses into the local template index")
+
+    def refresh_template_index(self, doc_id: str, clauses: list[Clause], embeddings: np.ndarray) -> None:
+        """Update the local template index after a template file has been (re-)indexed."""
+        # An index that has not been loaded yet picks the new clauses up on first use
+        if self.template_index.loaded:
+            self.template_index.replace_document(doc_id, clauses, embeddings)
+
+    def query_cache_stats(self) -> dict:
+        """Return hit/miss counters of the query vector cache."""
+        return self.query_vector_cache.stats()
+
+    def clause_cache_stats(self) -> dict:
+        """Return hit/miss, invalidation and size counters of the whole-contract clause cache."""
+        return self.clause_cache.stats()
+
+    def upload_stats(self) -> dict:
+        """Return the cumulative throughput and retry counters of clause uploads."""
+        totals = self.upload_totals
+        return {
+            "documents": totals.documents,
+            "succeeded": totals.succeeded,
+            "failed": len(totals.failed_keys),
+            "requests": totals.requests,
+            "retries": totals.retries,
+            "bytes_sent": totals.bytes_sent,
+            "docs_per_second": totals.docs_per_second,
+            "megabytes_per_second": totals.megabytes_per_second,
+        }
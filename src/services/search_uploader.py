@@ -0,0 +1,180 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from azure.core.exceptions import HttpResponseError
+from azure.search.documents.aio import SearchClient
+
+from config.settings import config
+
+
+@dataclass
+class UploadStats:
+    """Throughput and retry counters of one or more bulk uploads."""
+    documents: int = 0
+    succeeded: int = 0
+    requests: int = 0
+    retries: int = 0
+    bytes_sent: int = 0
+    elapsed: float = 0.0
+    failed_keys: list[str] = field(default_factory=list)
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.succeeded / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_sent / 1024 / 1024 / self.elapsed if self.elapsed else 0.0
+
+    def add(self, other: "UploadStats") -> None:
+        """Accumulate the counters of another upload into this one."""
+        self.documents += other.documents
+        self.succeeded += other.succeeded
+        self.requests += other.requests
+        self.retries += other.retries
+        self.bytes_sent += other.bytes_sent
+        self.elapsed += other.elapsed
+        self.failed_keys.extend(other.failed_keys)
+
+
+class SearchUploader:
+    """Uploads documents to a search index in size-bounded, concurrent batches.
+
+    Batches are cut by the estimated JSON size of their documents as well as by
+    count, and up to `max_concurrency` of them are in flight at once. The
+    per-document results of every request are checked and only the keys that
+    failed with a transient status are sent again, with jittered exponential
+    backoff, until `max_retries` is exhausted. NumPy vectors are converted to
+    lists only for the batch being sent.
+    """
+
+    ACTIONS = {
+        "upload": "upload_documents",
+        "merge": "merge_documents",
+        "merge_or_upload": "merge_or_upload_documents",
+    }
+    RETRYABLE_STATUS_CODES = {409, 422, 429, 503}
+    # Upper bound of a float in the SDK's JSON output, e.g. "-0.012345678901234567, "
+    VECTOR_ITEM_BYTES = 24
+
+    def __init__(
+        self,
+        search_client: SearchClient,
+        key_field: str = "id",
+        max_batch_bytes: Optional[int] = None,
+        max_batch_documents: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30.0
+    ):
+        self.search_client = search_client
+        self.key_field = key_field
+        self.max_batch_bytes = max_batch_bytes or config.SEARCH_UPLOAD_MAX_BYTES
+        self.max_batch_documents = max_batch_documents or config.SEARCH_UPLOAD_MAX_DOCUMENTS
+        self.max_concurrency = max_concurrency or config.SEARCH_UPLOAD_CONCURRENCY
+        self.max_retries = config.SEARCH_UPLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+    @classmethod
+    def estimate_size(cls, document: dict) -> int:
+        """Estimate the serialized size of a document in bytes without encoding its vectors."""
+        size = 2
+        for name, value in document.items():
+            is_vector = isinstance(value, np.ndarray) or (
+                isinstance(value, list) and value and isinstance(value[0], float)
+            )
+            if is_vector:
+                size += len(name) + 6 + len(value) * cls.VECTOR_ITEM_BYTES
+            else:
+                size += len(name) + 6 + len(json.dumps(value).encode("utf-8"))
+        return size
+
+    @staticmethod
+    def to_wire(document: dict) -> dict:
+        """Return the document with NumPy vectors converted to the JSON lists the SDK sends."""
+        if not any(isinstance(value, np.ndarray) for value in document.values()):
+            return document
+        return {
+            name: value.tolist() if isinstance(value, np.ndarray) else value
+            for name, value in document.items()
+        }
+
+    def plan_batches(self, documents: list[dict]) -> list[tuple[list[dict], int]]:
+        """Split documents into (batch, estimated bytes) pairs within the size and count limits."""
+        batches = []
+        batch, batch_bytes = [], 0
+        for document in documents:
+            size = self.estimate_size(document)
+            if batch and (
+                batch_bytes + size > self.max_batch_bytes
+                or len(batch) >= self.max_batch_documents
+            ):
+                batches.append((batch, batch_bytes))
+                batch, batch_bytes = [], 0
+            batch.append(document)
+            batch_bytes += size
+        if batch:
+            batches.append((batch, batch_bytes))
+        return batches
+
+    async def upload(self, documents: list[dict], action: str = "upload") -> UploadStats:
+        """Index documents with the given action ("upload", "merge" or "merge_or_upload").
+
+        Returns:
+            Counters of the upload, keys that still failed after all retries are in `failed_keys`
+        """
+        if action not in self.ACTIONS:
+            raise ValueError(f"Unsupported upload action '{action}', expected one of {list(self.ACTIONS)}")
+        send = getattr(self.search_client, self.ACTIONS[action])
+
+        stats = UploadStats(documents=len(documents))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+
+        async def upload_batch(batch: list[dict], batch_bytes: int) -> None:
+            attempt = 0
+            while batch:
+                try:
+                    # Only the request itself holds a slot, backoff sleeps do not
+                    async with semaphore:
+                        stats.requests += 1
+                        stats.bytes_sent += batch_bytes
+                        results = await send([self.to_wire(document) for document in batch])
+                except HttpResponseError as e:
+                    if e.status_code not in self.RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                        raise
+                    retry = batch
+                else:
+                    by_key = {document[self.key_field]: document for document in batch}
+                    retry = []
+                    for result in results:
+                        if result.succeeded:
+                            stats.succeeded += 1
+                        elif result.status_code in self.RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                            retry.append(by_key[result.key])
+                        else:
+                            stats.failed_keys.append(result.key)
+
+                if retry:
+                    attempt += 1
+                    stats.retries += len(retry)
+                    await asyncio.sleep(self._backoff(attempt))
+                batch = retry
+                batch_bytes = sum(self.estimate_size(document) for document in retry)
+
+        async with asyncio.TaskGroup() as tg:
+            for batch, batch_bytes in self.plan_batches(documents):
+                tg.create_task(upload_batch(batch, batch_bytes))
+
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
@@ -0,0 +1,194 @@
+import math
+import time
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+
+from models.clause import Clause
+from utils.text_processing import WORD_RE
+
+
+class TemplateIndex:
+    """In-process hybrid index over the template clauses.
+    
+    Keeps the clause embeddings as one normalized float32 matrix next to a small
+    BM25 keyword index, and ranks clauses by fusing cosine similarity and keyword
+    ranks the same way the search service fuses hybrid results (reciprocal rank
+    fusion). The template set is tiny, so a lookup is a single matrix-vector
+    product. Oversized clauses are ranked by their chunks and returned whole,
+    the clauses chunks were split from are kept aside in `parents`.
+    """
+
+    FILTER = "is_template eq true"
+
+    # Reciprocal rank fusion constant and BM25 parameters, as used by Azure AI Search
+    RRF_K = 60
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    # Similarity bonus for a template clause of the same clause type, enough to settle near-ties only
+    CLAUSE_TYPE_TIEBREAK = 0.01
+
+    # Seconds before an index that loaded no templates is reloaded, whatever the TTL
+    EMPTY_RELOAD_SECONDS = 5.0
+
+    def __init__(self):
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.clauses: list[Clause] = []
+        self.parents: dict[str, tuple[Clause, np.ndarray]] = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_lengths = np.zeros(0, dtype=np.float32)
+        self._clause_types = np.zeros(0, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def load(self, clauses: list[Clause], embeddings: np.ndarray) -> None:
+        """Replace the whole index with the given template clauses."""
+        self.parents = {
+            clause.id: (clause, embeddings[i]) for i, clause in enumerate(clauses) if clause.chunk_count
+        }
+        order = sorted(
+            (i for i, clause in enumerate(clauses) if not clause.chunk_count),
+            key=lambda i: (clauses[i].doc_id, clauses[i].section_index)
+        )
+        self.clauses = [clauses[i] for i in order]
+        matrix = np.asarray([embeddings[i] for i in order], dtype=np.float32)
+        if matrix.size:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        self.matrix = matrix
+        self._clause_types = np.asarray([clause.clause_type for clause in self.clauses], dtype=object)
+        self._build_keyword_index()
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    def is_stale(self, ttl_seconds: float) -> bool:
+        """Whether the index should be (re)loaded from the search index.
+        
+        True before the first load, once the index is older than `ttl_seconds`,
+        and shortly after a load that found no templates, so templates indexed
+        by another process are picked up without a restart.
+        """
+        if not self.loaded:
+            return True
+        max_age = ttl_seconds if self.clauses else min(ttl_seconds, self.EMPTY_RELOAD_SECONDS)
+        return time.monotonic() - self.loaded_at >= max_age
+
+    def replace_document(self, doc_id: str, clauses: list[Clause], embeddings: np.ndarray) -> None:
+        """Swap in the clauses of a re-ingested template file, keeping the other templates."""
+        kept = [i for i, clause in enumerate(self.clauses) if clause.doc_id != doc_id]
+        kept_parents = [parent for parent in self.parents.values() if parent[0].doc_id != doc_id]
+        self.load(
+            [self.clauses[i] for i in kept] + [clause for clause, _ in kept_parents] + list(clauses),
+            [self.matrix[i] for i in kept] + [embedding for _, embedding in kept_parents] + list(embeddings),
+        )
+
+    def get(self, clause_id: str) -> Optional[Clause]:
+        """Return a clause that was split into chunks by its id."""
+        parent = self.parents.get(clause_id)
+        return parent[0] if parent else None
+
+    def search(self, query: str, query_vector: np.ndarray, top: int = 1) -> list[tuple[Clause, float]]:
+        """Return the best matching clauses with their fused scores, best first.
+        
+        A clause split into chunks is returned once, with the score of its best chunk.
+        """
+        if not self.clauses:
+            return []
+
+        vector = np.asarray(query_vector, dtype=np.float32)
+        vector_scores = self.matrix @ (vector / (np.linalg.norm(vector) or 1))
+        fused = self._rrf(vector_scores)
+
+        keyword_scores = self._keyword_scores(query)
+        if keyword_scores.any():
+            # Like the search service, only keyword matches take part in the keyword ranking
+            fused += np.where(keyword_scores > 0, self._rrf(keyword_scores), 0)
+
+        matches, seen = [], set()
+        for i in np.argsort(-fused, kind="stable"):
+            clause = self.clauses[i]
+            if clause.is_chunk:
+                clause = self.get(clause.parent_id) or clause
+            if clause.id not in seen:
+                seen.add(clause.id)
+                matches.append((clause, float(fused[i])))
+                if len(matches) == top:
+                    break
+        return matches
+
+    def align(self, embeddings: np.ndarray, clause_types: list[str]) -> list[tuple[Optional[Clause], float]]:
+        """Return the best matching template clause and its cosine similarity for each embedding.
+        
+        All similarities come from one (clauses x templates) matrix product. A
+        template clause with the same (non-empty) clause type gets a small bonus,
+        so the type decides between near-equal matches; the returned score is the
+        plain similarity. Chunks are answered with the clause they were split from.
+        """
+        if not self.clauses or not len(embeddings):
+            return [(None, 0.0)] * len(embeddings)
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        similarities = (matrix / np.where(norms == 0, 1, norms)) @ self.matrix.T
+
+        types = np.asarray(clause_types, dtype=object)[:, np.newaxis]
+        same_type = (types == self._clause_types[np.newaxis, :]) & (types != "")
+        best = np.argmax(similarities + self.CLAUSE_TYPE_TIEBREAK * same_type, axis=1)
+        scores = similarities[np.arange(len(best)), best]
+
+        matches = []
+        for i, score in zip(best.tolist(), scores.tolist()):
+            clause = self.clauses[i]
+            if clause.is_chunk:
+                clause = self.get(clause.parent_id) or clause
+            matches.append((clause, score))
+        return matches
+
+    def _rrf(self, scores: np.ndarray) -> np.ndarray:
+        ranks = np.empty(len(scores), dtype=np.float32)
+        ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+        return 1.0 / (self.RRF_K + ranks)
+
+    @staticmethod
+    def _tokenize(text: str) -> list[str]:
+        return [token.lower() for token in WORD_RE.findall(text)]
+
+    def _build_keyword_index(self) -> None:
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = []
+        for i, clause in enumerate(self.clauses):
+            tokens = self._tokenize(f"{clause.section} {clause.text_clean}")
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, []).append((i, count))
+
+        self._doc_lengths = np.asarray(lengths, dtype=np.float32)
+        self._postings = {
+            term: (
+                np.fromiter((i for i, _ in entries), dtype=np.int64, count=len(entries)),
+                np.fromiter((c for _, c in entries), dtype=np.float32, count=len(entries)),
+            )
+            for term, entries in postings.items()
+        }
+
+    def _keyword_scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.clauses), dtype=np.float32)
+        if not self.clauses:
+            return scores
+
+        count = len(self.clauses)
+        average_length = float(self._doc_lengths.mean()) or 1.0
+        for term in set(self._tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            docs, term_freqs = posting
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self._doc_lengths[docs] / average_length)
+            scores[docs] += idf * term_freqs * (self.BM25_K1 + 1) / (term_freqs + norm)
+        return scores
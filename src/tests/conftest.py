@@ -0,0 +1,10 @@
+"""Offline tests of the ingestion and retrieval building blocks.
+
+Nothing here calls an Azure service or downloads a tokenizer. Run from the src directory:
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+# The modules under test import each other relative to src, like main.py does
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
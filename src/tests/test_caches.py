@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from models.clause import Clause
+from services.clause_cache import ClauseCache
+from utils.async_cache import AsyncTTLCache
+
+
+def clause(i: int, doc_id: str = "contract.pdf") -> Clause:
+    return Clause(f"c{i}", doc_id, i, "Section", "text", "text", "clause", "payment", False)
+
+
+class CountingLoader:
+    """Loader that blocks until released and counts how often it was called."""
+
+    def __init__(self, value, error: Exception = None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def new_cache(settle_seconds: float = 0.0) -> ClauseCache:
+    return ClauseCache(max_bytes=1_000_000, max_entries=10, ttl_seconds=60, settle_seconds=settle_seconds)
+
+
+def test_ttl_cache_loads_concurrent_misses_once():
+    async def run():
+        cache = AsyncTTLCache(max_size=10, ttl_seconds=60)
+        loader = CountingLoader([1.0, 2.0])
+        waiters = [asyncio.create_task(cache.get_or_load("query", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*waiters)
+        cached = await cache.get_or_load("query", loader)
+        return cache, loader, results, cached
+
+    cache, loader, results, cached = asyncio.run(run())
+
+    assert loader.calls == 1
+    assert results == [[1.0, 2.0]] * 5
+    assert cached == [1.0, 2.0]
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_ttl_cache_shares_a_failed_load_and_does_not_cache_it():
+    async def run():
+        cache = AsyncTTLCache(max_size=10, ttl_seconds=60)
+        loader = CountingLoader(None, error=RuntimeError("throttled"))
+        waiters = [asyncio.create_task(cache.get_or_load("query", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return cache, loader, results
+
+    cache, loader, results = asyncio.run(run())
+
+    assert loader.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("query") is None
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    async def run():
+        cache = AsyncTTLCache(max_size=2, ttl_seconds=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        evicted = cache.get("b")
+        await asyncio.sleep(0.06)
+        return evicted, cache.get("a")
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_clause_cache_loads_concurrent_misses_once():
+    async def run():
+        cache = new_cache()
+        loader = CountingLoader([clause(0), clause(1)])
+        waiters = [
+            asyncio.create_task(cache.get_or_load("doc_id eq 'contract.pdf'", loader, "contract.pdf"))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*waiters)
+        return cache, loader, results
+
+    cache, loader, results = asyncio.run(run())
+
+    assert loader.calls == 1
+    assert all(result == [clause(0), clause(1)] for result in results)
+    assert cache.get("doc_id eq 'contract.pdf'") == [clause(0), clause(1)]
+
+
+def test_clause_cache_does_not_store_a_fetch_that_overlapped_a_write():
+    async def run():
+        cache = new_cache()
+        loader = CountingLoader([clause(0)])
+        fetch = asyncio.create_task(cache.get_or_load("doc_id eq 'contract.pdf'", loader, "contract.pdf"))
+        await asyncio.sleep(0)
+        cache.invalidate_documents(["contract.pdf"])
+        loader.release.set()
+        return cache, await fetch
+
+    cache, result = asyncio.run(run())
+
+    assert result == [clause(0)]
+    assert cache.get("doc_id eq 'contract.pdf'") is None
+
+
+@pytest.mark.parametrize("doc_id, cached", [("contract.pdf", False), ("other.pdf", True), (None, False)])
+def test_clause_cache_settle_window(doc_id, cached):
+    async def run():
+        cache = new_cache(settle_seconds=0.1)
+        cache.invalidate_documents(["contract.pdf"])
+
+        # Started inside the window: the index may not show the write yet
+        loader = CountingLoader([clause(0)])
+        loader.release.set()
+        result = await cache.get_or_load("filter", loader, doc_id)
+        inside = cache.get("filter")
+
+        await asyncio.sleep(0.11)
+        await cache.get_or_load("filter", loader, doc_id)
+        return result, inside, cache.get("filter")
+
+    result, inside, after = asyncio.run(run())
+
+    assert result == [clause(0)]
+    assert (inside is not None) == cached
+    assert after == [clause(0)]
+
+
+def test_clause_cache_write_invalidates_document_and_multi_document_entries():
+    async def run():
+        cache = new_cache()
+        for filter, doc_id in [("a", "a.pdf"), ("b", "b.pdf"), ("templates", None)]:
+            loader = CountingLoader([clause(0, doc_id or "template-01.pdf")])
+            loader.release.set()
+            await cache.get_or_load(filter, loader, doc_id)
+        cache.invalidate_documents(["a.pdf"])
+        return cache
+
+    cache = asyncio.run(run())
+
+    assert cache.get("a") is None
+    assert cache.get("templates") is None
+    assert cache.get("b") is not None
@@ -0,0 +1,117 @@
+import pytest
+
+from models.clause import Clause
+from utils import tokens
+from utils.context_packer import SUMMARY_MARKER, ContextPacker
+
+
+class WordEncoding:
+    """Counts one token per space-separated word, so budgets are easy to reason about offline."""
+
+    def encode_ordinary(self, text: str) -> list[str]:
+        return text.split(" ")
+
+    def encode_ordinary_batch(self, texts: list[str]) -> list[list[str]]:
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, words: list[str]) -> str:
+        return " ".join(words)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(tokens, "get_encoding", lambda model_name: WordEncoding())
+
+
+def clause(i: int, clause_type: str, text: str, is_template: bool = False) -> Clause:
+    doc_id = "template-01.pdf" if is_template else "contract.pdf"
+    return Clause(f"c{i}", doc_id, i, f"Section {i}", text, text.lower(), "clause", clause_type, is_template)
+
+
+def words(count: int, word: str = "term") -> str:
+    return " ".join([word] * count)
+
+
+UPLOADED = [
+    clause(0, "payment", words(100, "fees")),
+    clause(1, "execution", words(100, "signed")),
+    clause(2, "term", words(100, "years")),
+]
+TEMPLATE = [
+    clause(10, "payment", words(100, "invoice"), True),
+    clause(11, "term", words(100, "years"), True),
+    clause(12, "confidentiality", words(100, "secret"), True),
+]
+# Each uploaded clause with its most similar template clause, the signature block has none
+ALIGNMENT = [
+    (UPLOADED[0], TEMPLATE[0], 0.8),
+    (UPLOADED[1], None, 0.0),
+    (UPLOADED[2], TEMPLATE[1], 1.0),
+]
+
+
+def test_context_under_budget_is_kept_whole():
+    packer = ContextPacker("gpt-4.1", max_tokens=10_000, summary_tokens=10)
+
+    packed = packer.pack_contracts(ALIGNMENT, TEMPLATE)
+
+    assert packed.fits
+    assert packed.clauses_summarized == packed.clauses_dropped == 0
+    assert "Missing from uploaded confidentiality (Section 12)" in packed.text
+    # The identical template term clause is replaced by a note
+    assert packed.clauses_deduplicated == 1
+    assert "Template term (Section 11): identical to the uploaded clause" in packed.text
+
+
+def test_lowest_value_entries_are_reduced_first():
+    packer = ContextPacker("gpt-4.1", max_tokens=10_000, summary_tokens=10)
+    full = packer.pack_contracts(ALIGNMENT, TEMPLATE)
+
+    packed = packer.pack_contracts(ALIGNMENT, TEMPLATE, max_tokens=full.tokens - 50)
+
+    assert packed.fits
+    assert packed.clauses_summarized == 1
+    assert "Uploaded execution (Section 1):\nsigned" in packed.text
+    assert packed.text.count(SUMMARY_MARKER) == 1
+    assert "invoice " * 20 in packed.text
+
+
+def test_uploaded_and_missing_clauses_are_summarized_but_never_dropped():
+    packer = ContextPacker("gpt-4.1", max_tokens=10_000, summary_tokens=10)
+
+    packed = packer.pack_contracts(ALIGNMENT, TEMPLATE, max_tokens=30)
+
+    for heading in ["Uploaded payment", "Uploaded term", "Missing from uploaded confidentiality"]:
+        assert heading in packed.text
+    # The low-value clause and the template clauses matched by an uploaded clause go entirely
+    assert "Uploaded execution" not in packed.text
+    assert "Template payment" not in packed.text
+    assert "Template term" not in packed.text
+    assert packed.clauses_dropped == 3
+    assert packed.tokens > packed.budget
+    assert not packed.fits
+
+
+def test_desired_terms_count_against_the_budget_but_are_not_reduced():
+    packer = ContextPacker("gpt-4.1", max_tokens=10_000, summary_tokens=10)
+    desired_terms = words(200, "desired")
+    full = packer.pack_contracts(ALIGNMENT, TEMPLATE)
+
+    packed = packer.pack_contracts(ALIGNMENT, TEMPLATE, desired_terms, max_tokens=full.tokens)
+
+    assert packed.text.startswith(desired_terms)
+    assert packed.original_tokens == full.original_tokens + 200
+    assert packed.fits
+    assert packed.clauses_summarized + packed.clauses_dropped > 0
+    assert packer.stats()["requests"] == 2
+
+
+def test_template_clause_aligned_with_several_uploaded_clauses_is_written_once():
+    packer = ContextPacker("gpt-4.1", max_tokens=10_000, summary_tokens=10)
+    alignment = ALIGNMENT + [(clause(3, "payment", words(50, "late")), TEMPLATE[0], 0.7)]
+
+    packed = packer.pack_contracts(alignment, TEMPLATE)
+
+    assert packed.text.count("Template payment (Section 10)") == 1
+    assert packed.text.index("Template payment") < packed.text.index("Uploaded execution")
+    assert "Missing from uploaded payment" not in packed.text
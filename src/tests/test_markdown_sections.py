@@ -0,0 +1,88 @@
+import asyncio
+import random
+
+from langchain_text_splitters import MarkdownHeaderTextSplitter
+
+from models.document import Page
+from utils.markdown_sections import MarkdownSectionSplitter
+
+# Same as DocumentProcessor.DEFAULT_HEADERS
+HEADERS = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
+
+
+def paginate(text: str, seed: int) -> list[Page]:
+    """Cut text into pages at random points, mid-line and mid-paragraph included."""
+    rng = random.Random(seed)
+    pages, offset = [], 0
+    while offset < len(text):
+        size = rng.randint(1, 120)
+        pages.append(Page(page_num=len(pages) + 1, offset=offset, text=text[offset:offset + size]))
+        offset += size
+    return pages
+
+
+def contract(seed: int) -> str:
+    rng = random.Random(seed)
+    sentence = "The Consultant shall provide the Services described in the Statement of Work. "
+    parts = ["Preamble before any heading.\n\n"]
+    for section in range(1, 25):
+        if section % 8 == 1:
+            parts.append(f"# Article {section // 8 + 1}\n\n")
+        parts.append(f"## {section}. Section heading\n\n")
+        if section % 5 == 0:
+            parts.append(f"### {section}.1 Subsection\n\n")
+        if section % 7 == 0:
+            parts.append("```\n# not a heading\n\n## still code\n```\n\n")
+        parts.extend(sentence * rng.randint(1, 3) + "\n\n" for _ in range(rng.randint(1, 3)))
+    return "".join(parts)
+
+
+def langchain_sections(text: str) -> list[tuple[str, dict]]:
+    splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS, strip_headers=True)
+    return [(chunk.page_content, chunk.metadata) for chunk in splitter.split_text(text)]
+
+
+def test_sections_match_langchain_however_the_pages_break():
+    splitter = MarkdownSectionSplitter(headers_to_split_on=HEADERS)
+    for seed in range(10):
+        text = contract(seed)
+        expected = langchain_sections(text)
+
+        actual = [(section.page_content, section.metadata) for section in splitter.split_pages(paginate(text, seed))]
+
+        assert actual == expected
+
+
+def test_streamed_pages_split_like_a_list_of_pages():
+    splitter = MarkdownSectionSplitter(headers_to_split_on=HEADERS)
+    pages = paginate(contract(1), 1)
+
+    async def stream():
+        for page in pages:
+            await asyncio.sleep(0)
+            yield page
+
+    async def split():
+        return [section async for section in splitter.split_pages_async(stream())]
+
+    streamed = asyncio.run(split())
+    listed = list(splitter.split_pages(pages))
+
+    assert [(s.page_content, s.metadata, s.start, s.end) for s in streamed] == [
+        (s.page_content, s.metadata, s.start, s.end) for s in listed
+    ]
+
+
+def test_sections_record_their_offsets_and_pages():
+    pages = [
+        Page(page_num=1, offset=0, text="## Fees\n\nInvoices are paid "),
+        Page(page_num=2, offset=26, text="monthly.\n\n## Term\n\nOne year.\n"),
+    ]
+    text = "".join(page.text for page in pages)
+
+    sections = list(MarkdownSectionSplitter(headers_to_split_on=HEADERS).split_pages(pages))
+
+    assert [section.metadata for section in sections] == [{"Header 2": "Fees"}, {"Header 2": "Term"}]
+    assert [(section.first_page, section.last_page) for section in sections] == [(1, 2), (2, 2)]
+    assert text[sections[0].start:sections[0].end].startswith("Invoices are paid")
+    assert text[sections[1].start:sections[1].end].strip() == "One year."
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from services.rate_limiter import AdaptiveRateLimiter
+
+
+def test_rate_is_halved_on_429_and_recovers_on_success():
+    limiter = AdaptiveRateLimiter(60_000, 600, min_rate_factor=0.1, recovery_step=0.05)
+
+    limiter.on_rate_limited(retry_after=0)
+    limiter.on_rate_limited(retry_after=0)
+    assert limiter.rate_factor == 0.25
+    assert limiter.throttled_count == 2
+
+    for _ in range(5):
+        limiter.on_rate_limited(retry_after=0)
+    assert limiter.rate_factor == 0.1
+
+    for _ in range(30):
+        limiter.on_success()
+    assert limiter.rate_factor == 1.0
+
+
+def test_requests_wait_out_retry_after():
+    async def run():
+        limiter = AdaptiveRateLimiter(6_000_000, 600_000)
+        await limiter.acquire(10)
+        limiter.on_rate_limited(retry_after=0.2)
+
+        start = time.monotonic()
+        await limiter.acquire(10)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.2
+
+
+def test_tokens_refill_at_the_reduced_rate():
+    async def run(rate_limited: bool):
+        # 100 tokens per second at full rate, the bucket holds a minute's worth
+        limiter = AdaptiveRateLimiter(6_000, 6_000)
+        await limiter.acquire(6_000)
+        if rate_limited:
+            limiter.on_rate_limited(retry_after=0.01)
+
+        start = time.monotonic()
+        await limiter.acquire(10)
+        return time.monotonic() - start
+
+    full_rate = asyncio.run(run(rate_limited=False))
+    half_rate = asyncio.run(run(rate_limited=True))
+
+    assert 0.08 <= full_rate < 0.18
+    assert half_rate >= 0.18
+
+
+def test_oversized_request_is_let_through_on_a_full_bucket():
+    async def run():
+        limiter = AdaptiveRateLimiter(1_000, 10)
+        await asyncio.wait_for(limiter.acquire(5_000), timeout=1)
+        return limiter._tokens
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,98 @@
+import numpy as np
+
+from models.clause import Clause
+from services.template_index import TemplateIndex
+
+
+def clause(i: int, section: str, text: str, clause_type: str = "", **fields) -> Clause:
+    return Clause(f"t{i}", "template-01.pdf", i, section, text, text.lower(), "clause", clause_type, True, **fields)
+
+
+def build_index(clauses: list[Clause], embeddings: list[list[float]]) -> TemplateIndex:
+    index = TemplateIndex()
+    index.load(clauses, np.asarray(embeddings, dtype=np.float32))
+    return index
+
+
+def rrf(rank: int) -> float:
+    return 1.0 / (TemplateIndex.RRF_K + rank)
+
+
+def test_vector_and_keyword_ranks_are_fused():
+    index = build_index(
+        [
+            clause(0, "Payment", "invoices are paid within thirty days"),
+            clause(1, "Termination", "either party may terminate on notice"),
+            clause(2, "Confidentiality", "confidential information stays secret"),
+        ],
+        [[1, 0, 0], [0, 1, 0], [0, 0, 1]],
+    )
+
+    # Closest vector and only keyword match: first in both rankings
+    matches = index.search("terminate", np.asarray([0.1, 1, 0], dtype=np.float32), top=3)
+
+    assert [match.id for match, _ in matches] == ["t1", "t0", "t2"]
+    assert np.isclose(matches[0][1], rrf(1) + rrf(1))
+    # Clauses without a keyword match only get their vector rank
+    assert np.isclose(matches[1][1], rrf(2))
+    assert np.isclose(matches[2][1], rrf(3))
+
+
+def test_keyword_rank_can_outweigh_vector_rank():
+    index = build_index(
+        [clause(0, "Payment", "invoices are paid monthly"), clause(1, "Fees", "late fees accrue interest")],
+        [[1, 0], [0.9, 0.1]],
+    )
+
+    matches = index.search("late fees", np.asarray([1, 0], dtype=np.float32), top=2)
+
+    # Second by vector, but the only keyword match
+    assert matches[0][0].id == "t1"
+    assert np.isclose(matches[0][1], rrf(2) + rrf(1))
+
+
+def test_bm25_prefers_rarer_terms_and_shorter_clauses():
+    index = build_index(
+        [
+            clause(0, "Notices", "notice notice"),
+            clause(1, "Notices", "notice in writing to the address of the other party as set out above"),
+            clause(2, "Audit", "audit rights"),
+        ],
+        [[1, 0], [1, 0], [0, 1]],
+    )
+
+    scores = index._keyword_scores("notice audit")
+
+    assert scores[0] > scores[1] > 0
+    # "audit" occurs in one clause only, so it weighs more than "notice"
+    assert scores[2] > scores[1]
+
+
+def test_chunks_answer_with_their_parent_once():
+    parent = clause(0, "Services", "long services clause", "services", chunk_count=2)
+    chunks = [
+        clause(1, "Services", "first part", "services", parent_id="t0")._replace(id="t0_part0"),
+        clause(2, "Services", "second part", "services", parent_id="t0")._replace(id="t0_part1"),
+    ]
+    index = build_index(
+        [parent, *chunks, clause(3, "Fees", "fees", "payment")],
+        [[0, 0], [1, 0], [0.9, 0.1], [0, 1]],
+    )
+
+    matches = index.search("", np.asarray([1, 0], dtype=np.float32), top=2)
+
+    assert [match.id for match, _ in matches] == ["t0", "t3"]
+    assert len(index) == 3
+
+
+def test_align_breaks_near_ties_by_clause_type():
+    index = build_index(
+        [clause(0, "Fees", "fees", "payment"), clause(1, "Term", "term", "term")],
+        [[1, 0], [1, 0.001]],
+    )
+
+    matches = index.align(np.asarray([[1, 0], [1, 0]], dtype=np.float32), ["term", ""])
+
+    assert matches[0][0].id == "t1"
+    assert matches[1][0].id == "t0"
+    assert np.isclose(matches[0][1], 1.0, atol=1e-3)
@@ -1,5 +1,6 @@
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Iterable, Optional
 
 # Canonical clause types
 CLAUSE_TYPES = [
@@ -149,12 +150,14 @@ _PRENUMBER = re.compile(
     re.VERBOSE | re.IGNORECASE,
 )
 
-def _normalize_heading(h: str) -> str:
-    h = h.strip()
-    h = _PRENUMBER.sub("", h)           # remove leading numbering/labels
-    h = re.sub(r"[_#*:•\-–—]+", " ", h) # collapse bullets/punct
-    h = re.sub(r"\s+", " ", h)          # squeeze spaces
-    return h.strip()
+# Bullets/punctuation and whitespace collapse to one space in a single pass
+_SEPARATORS = re.compile(r"[_#*:•\-–—\s]+")
+
+# Special case: a heading like "Term and Termination" → prefer termination
+SPECIAL_RULES: list[tuple[str, list[re.Pattern]]] = [
+    ("termination", [re.compile(r"\btermination\b", re.I)]),
+    ("term", [re.compile(r"\bterm\b", re.I)]),
+]
 
 def classify_clause_heading(heading: str, default: Optional[str] = None) -> Optional[str]:
     """
@@ -162,18 +165,66 @@ def classify_clause_heading(heading: str, default: Optional[str] = None) -> Opti
     - Case-insensitive, tolerant of numbering/bullets.
     - First matching rule wins (ordered by specificity/priority).
     - If none match, returns `default` (None by default).
+    Classification is done by the shared `CompiledClauseClassifier` below.
     """
-    if not heading or not heading.strip():
-        return default
-    h = _normalize_heading(heading)
+    return clause_classifier.classify(heading, default)
+
+
+class CompiledClauseClassifier:
+    """Classifies headings with all rules folded into one compiled pattern.
     
-    # Special case: a heading like "Term and Termination" → prefer termination
-    if re.search(r"\btermination\b", h, re.I):
-        return "termination"
-    if re.search(r"\bterm\b", h, re.I):
-        # Only return 'term' if 'termination' wasn't present
-        return "term"
+    Each rule becomes a lookahead alternative anchored at the start of the
+    heading, `^(?:(?=(?P<r0>.*?(?:p|q)))|(?=(?P<r1>.*?(?:r|s)))|...)`. The regex
+    engine tries the alternatives in order and stops at the first one that
+    matches anywhere in the heading, so the special cases and then `RULES` keep
+    their first-match-wins priority. Results are memoized by normalized heading.
+    """
+
+    def __init__(
+        self, 
+        rules: Optional[list[tuple[str, list[re.Pattern]]]] = None, 
+        memo_size: int = 4096
+    ):
+        self.rules = SPECIAL_RULES + (RULES if rules is None else rules)
+        alternatives = []
+        for index, (_, patterns) in enumerate(self.rules):
+            body = "|".join(f"(?:{pattern.pattern})" for pattern in patterns)
+            alternatives.append(f"(?=(?P<r{index}>.*?(?:{body})))")
+        self.pattern = re.compile(f"^(?:{'|'.join(alternatives)})", re.I | re.S)
+        self._types = {f"r{index}": clause_type for index, (clause_type, _) in enumerate(self.rules)}
+        self._classify_normalized = lru_cache(maxsize=memo_size)(self._match)
+
+    @staticmethod
+    def normalize(heading: str) -> str:
+        heading = _PRENUMBER.sub("", heading.strip())
+        return _SEPARATORS.sub(" ", heading).strip()
+
+    def _match(self, normalized: str) -> Optional[str]:
+        # TODO: Apply rules to classify heading
+
+        return None
+
+    def classify(self, heading: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the clause_type of a heading, the same one `RULES` would give, or `default`."""
+        if not heading or not heading.strip():
+            return default
+        clause_type = self._classify_normalized(self.normalize(heading))
+        return default if clause_type is None else clause_type
+
+    def classify_many(self, headings: Iterable[str], default: Optional[str] = None) -> list[Optional[str]]:
+        """Classify all headings of a document, each distinct heading only once."""
+        headings = list(headings)
+        by_heading = {heading: self.classify(heading, default) for heading in dict.fromkeys(headings)}
+        return [by_heading[heading] for heading in headings]
+
+    def memo_stats(self) -> dict:
+        """Return hit/miss counters of the normalized heading memo."""
+        info = self._classify_normalized.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+
 
-   # TODO: Apply rules to classify heading
+clause_classifier = CompiledClauseClassifier()
 
-    return default
+def classify_clause_headings(headings: Iterable[str], default: Optional[str] = None) -> list[Optional[str]]:
+    """Return the clause_type of each heading of a document, see `CompiledClauseClassifier`."""
+    return clause_classifier.classify_many(headings, default)
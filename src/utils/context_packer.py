@@ -0,0 +1,218 @@
+import heapq
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from models.clause import Clause
+from utils.tokens import count_tokens, count_tokens_batch, split_by_tokens
+
+# Clause types that carry little for a comparison (unclassified text, signature blocks)
+LOW_VALUE_CLAUSE_TYPES = frozenset({"", "execution"})
+
+# Reduction order, lowest first: what goes first when a context is over budget
+_PRIORITY_LOW_VALUE = 0
+_PRIORITY_MATCHED_TEMPLATE = 1
+_PRIORITY_KEEP = 2
+
+SUMMARY_MARKER = " [...]"
+
+
+@dataclass
+class PackedContext:
+    """The packed text of a prompt context and what fitting it into the budget cost."""
+    text: str
+    tokens: int
+    original_tokens: int
+    budget: int
+    clauses_summarized: int = 0
+    clauses_dropped: int = 0
+    clauses_deduplicated: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+    @property
+    def fits(self) -> bool:
+        return self.tokens <= self.budget
+
+
+@dataclass
+class _Entry:
+    label: str
+    clause: Clause
+    priority: int
+    text: str
+    tokens: int = 0
+    # 0 full, 1 summarized, 2 dropped
+    state: int = 0
+
+
+@dataclass
+class PackingTotals:
+    """Cumulative counters of every context packed by one packer."""
+    requests: int = 0
+    original_tokens: int = 0
+    tokens: int = 0
+    over_budget: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+class ContextPacker:
+    """Fits whole-contract prompt context into a token budget.
+
+    Every uploaded clause is followed by the template clause aligned with it,
+    each template clause written once, and template clauses no uploaded clause
+    is aligned with are listed at the end as missing. Every entry is
+    measured with tiktoken. A template clause identical to its uploaded
+    counterpart is always replaced by a shorter one-line note. While the context is
+    over budget, the lowest-value entry is then reduced, largest first within a
+    tier: low-value clauses (unclassified text, signature blocks) before
+    template clauses that have an uploaded counterpart, before everything else.
+    An entry is first summarized to its opening `summary_tokens` tokens and,
+    for the two lowest tiers, then dropped. Uploaded clauses and missing
+    template clauses are summarized at most, never dropped.
+    """
+
+    def __init__(self, model_name: str, max_tokens: int, summary_tokens: int):
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.totals = PackingTotals()
+        self.logger = logging.getLogger(__name__)
+
+    def pack_clauses(self, clauses: list[Clause], max_tokens: Optional[int] = None) -> PackedContext:
+        """Pack the clauses of a single contract."""
+        entries = [self._entry("", clause, self._priority(clause, matched=False)) for clause in clauses]
+        return self._pack(entries, "", max_tokens)
+
+    def pack_contracts(
+        self,
+        alignment: list[tuple[Clause, Optional[Clause], float]],
+        template: list[Clause],
+        desired_terms: str = "",
+        max_tokens: Optional[int] = None
+    ) -> PackedContext:
+        """Pack an uploaded contract aligned with the template, and the desired terms.
+
+        alignment pairs every uploaded clause with its most similar template
+        clause and the similarity, as SearchService.get_template_alignment returns
+        it. The desired terms are counted against the budget but never reduced.
+        """
+        entries, paired_ids, deduplicated = [], set(), 0
+        for clause, match, _ in alignment:
+            entries.append(self._entry("Uploaded", clause, self._priority(clause, matched=False)))
+            if match is None or match.id in paired_ids:
+                continue
+            paired_ids.add(match.id)
+            entry = self._entry("Template", match, self._priority(match, matched=True))
+            note = f"{self._heading(entry)}: identical to the uploaded clause"
+            if match.text_clean == clause.text_clean and len(note) < len(entry.text):
+                entry.text = note
+                deduplicated += 1
+            entries.append(entry)
+
+        for clause in template:
+            if clause.id in paired_ids:
+                continue
+            label = "Missing from uploaded" if clause.clause_type else "Template"
+            entries.append(self._entry(label, clause, self._priority(clause, matched=False)))
+
+        return self._pack(entries, desired_terms, max_tokens, deduplicated)
+
+    def _pack(
+        self, 
+        entries: list[_Entry], 
+        desired_terms: str, 
+        max_tokens: Optional[int], 
+        deduplicated: int = 0
+    ) -> PackedContext:
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        original_texts = [self._full_text(entry) for entry in entries]
+        original_tokens = sum(count_tokens_batch(original_texts, self.model_name))
+        fixed_tokens = count_tokens(desired_terms, self.model_name) if desired_terms else 0
+
+        for entry, tokens in zip(entries, count_tokens_batch([entry.text for entry in entries], self.model_name)):
+            entry.tokens = tokens
+        total = fixed_tokens + sum(entry.tokens for entry in entries)
+        original_tokens += fixed_tokens
+
+        # Cheapest loss first: lowest priority, then the entry that frees the most tokens
+        heap = [(entry.priority, -entry.tokens, i) for i, entry in enumerate(entries)]
+        heapq.heapify(heap)
+        summarized = dropped = 0
+        while total > budget and heap:
+            _, _, i = heapq.heappop(heap)
+            entry = entries[i]
+            if entry.state == 0 and entry.tokens > self.summary_tokens:
+                summary = split_by_tokens(entry.clause.text_full, self.model_name, self.summary_tokens)[0]
+                entry.text = f"{self._heading(entry)}:\n{summary}{SUMMARY_MARKER}"
+                tokens = count_tokens(entry.text, self.model_name)
+                total -= entry.tokens - tokens
+                entry.tokens, entry.state = tokens, 1
+                summarized += 1
+                heapq.heappush(heap, (entry.priority, -entry.tokens, i))
+            elif entry.priority < _PRIORITY_KEEP:
+                total -= entry.tokens
+                entry.tokens, entry.state = 0, 2
+                dropped += 1
+
+        parts = [desired_terms] if desired_terms else []
+        parts.extend(entry.text for entry in entries if entry.state != 2)
+        packed = PackedContext(
+            text="\n\n".join(parts),
+            tokens=total,
+            original_tokens=original_tokens,
+            budget=budget,
+            clauses_summarized=summarized,
+            clauses_dropped=dropped,
+            clauses_deduplicated=deduplicated,
+        )
+        self._record(packed)
+        return packed
+
+    def _record(self, packed: PackedContext) -> None:
+        totals = self.totals
+        totals.requests += 1
+        totals.original_tokens += packed.original_tokens
+        totals.tokens += packed.tokens
+        totals.over_budget += not packed.fits
+        self.logger.info(
+            f"Packed context into {packed.tokens}/{packed.budget} tokens, saved {packed.saved_tokens} "
+            f"({packed.clauses_deduplicated} identical, {packed.clauses_summarized} summarized, "
+            f"{packed.clauses_dropped} dropped)"
+        )
+
+    def _entry(self, label: str, clause: Clause, priority: int) -> _Entry:
+        entry = _Entry(label, clause, priority, "")
+        entry.text = self._full_text(entry)
+        return entry
+
+    def _full_text(self, entry: _Entry) -> str:
+        return f"{self._heading(entry)}:\n{entry.clause.text_full}"
+
+    @staticmethod
+    def _heading(entry: _Entry) -> str:
+        clause = entry.clause
+        heading = f"{clause.clause_type or 'other'} ({clause.section})"
+        return f"{entry.label} {heading}" if entry.label else heading
+
+    @staticmethod
+    def _priority(clause: Clause, matched: bool) -> int:
+        if clause.clause_type in LOW_VALUE_CLAUSE_TYPES:
+            return _PRIORITY_LOW_VALUE
+        return _PRIORITY_MATCHED_TEMPLATE if matched else _PRIORITY_KEEP
+
+    def stats(self) -> dict:
+        """Return the cumulative token counts and savings of every packed context."""
+        totals = self.totals
+        return {
+            "requests": totals.requests,
+            "original_tokens": totals.original_tokens,
+            "tokens": totals.tokens,
+            "saved_tokens": totals.saved_tokens,
+            "over_budget": totals.over_budget,
+        }
@@ -0,0 +1,80 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+from utils.clause_classifier import clause_classifier
+
+# `##` sections of the desired terms file and the clause types each one governs.
+# Sections not listed are classified by their heading; the ones that match no
+# clause type (red flags, negotiation priorities, risk scoring) are general policy.
+SECTION_CLAUSE_TYPES: dict[str, tuple[str, ...]] = {
+    "PAYMENT AND FINANCIAL TERMS": ("fees", "expenses", "consideration"),
+    "TERMINATION AND NOTICE": ("termination", "term", "notices"),
+    "INTELLECTUAL PROPERTY AND OWNERSHIP": ("ip",),
+    "CONFIDENTIALITY": ("confidentiality",),
+    "LIABILITY AND RISK ALLOCATION": ("liability", "indemnification", "warranty"),
+    "INDEPENDENT CONTRACTOR STATUS": ("relationship", "exclusivity"),
+    "DISPUTE RESOLUTION": ("dispute_resolution",),
+    "GOVERNING LAW AND JURISDICTION": ("governing_law",),
+    "FORCE MAJEURE": ("misc",),
+    "CONTRACT MODIFICATION AND INTEGRATION": ("amendments", "entire_agreement", "severability"),
+}
+
+_SECTION_RE = re.compile(r"^## +(.+?)\s*$", re.M)
+
+
+class DesiredTermsIndex:
+    """The desired terms file split into its `##` sections, indexed by clause type.
+
+    `for_clause_type` returns only the sections that govern a clause type, in
+    file order, so a per-clause prompt carries the policy it needs instead of
+    the whole file. The general sections (red flags, negotiation priorities,
+    risk scoring) apply to every clause and are always included. Results are
+    memoized per clause type; the index never changes once built.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        matches = list(_SECTION_RE.finditer(text))
+        self.headings = [match.group(1) for match in matches]
+        self.sections = [
+            text[match.start():matches[i + 1].start() if i + 1 < len(matches) else len(text)].strip()
+            for i, match in enumerate(matches)
+        ]
+
+        self.sections_by_type: dict[str, list[int]] = {}
+        self.general: list[int] = []
+        for i, heading in enumerate(self.headings):
+            clause_types = SECTION_CLAUSE_TYPES.get(heading.upper())
+            if clause_types is None:
+                clause_type = clause_classifier.classify(heading, "")
+                clause_types = (clause_type,) if clause_type else ()
+            if not clause_types:
+                self.general.append(i)
+            for clause_type in clause_types:
+                self.sections_by_type.setdefault(clause_type, []).append(i)
+        self._memo: dict[tuple[str, ...], str] = {}
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def for_clause_type(self, clause_type: str) -> str:
+        """Return the desired terms that govern one clause type."""
+        return self.for_clause_types([clause_type])
+
+    def for_clause_types(self, clause_types: Iterable[str]) -> str:
+        """Return the desired terms that govern any of the clause types and the general ones, each section once."""
+        key = tuple(sorted(set(clause_types)))
+        text = self._memo.get(key)
+        if text is None:
+            indices = {i for clause_type in key for i in self.sections_by_type.get(clause_type, ())}
+            text = "\n\n".join(self.sections[i] for i in sorted(indices.union(self.general)))
+            self._memo[key] = text
+        return text
+
+
+@lru_cache(maxsize=None)
+def shared_desired_terms(path: str) -> DesiredTermsIndex:
+    """Parse the desired terms file once per process and hand every caller the same index."""
+    return DesiredTermsIndex(Path(path).read_text(encoding="utf-8"))
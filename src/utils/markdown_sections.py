@@ -0,0 +1,185 @@
+from bisect import bisect_right
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+
+from models.document import Page, Section
+
+
+class MarkdownSectionSplitter:
+    """Streaming markdown header splitter that keeps track of pages.
+
+    Produces the same chunks as LangChain's MarkdownHeaderTextSplitter with
+    `strip_headers=True`: lines are stripped, paragraphs inside a section are
+    joined with "  \\n", fenced code blocks are never split, and neighbouring
+    chunks with the same headers are merged. Pages are consumed one at a time
+    in a single pass over their lines, so only the open section and the line
+    being read are held in memory, and every section records the character
+    offsets and page range it came from.
+    """
+
+    def __init__(self, headers_to_split_on: list[tuple[str, Optional[str]]]):
+        # Longest separator first, so "##" is not taken for "#"
+        self.headers_to_split_on = sorted(headers_to_split_on, key=lambda h: len(h[0]), reverse=True)
+
+    def split_text(self, text: str) -> list[Section]:
+        """Split a whole markdown document, treating it as a single page."""
+        return list(self.split_pages([Page(page_num=1, offset=0, text=text)]))
+
+    def split_pages(self, pages: Iterable[Page]) -> Iterator[Section]:
+        """Yield the sections of a document as soon as each one is closed."""
+        state = _SplitState(self.headers_to_split_on)
+        for page in pages:
+            yield from state.feed(page)
+        yield from state.close()
+
+    async def split_pages_async(self, pages: AsyncIterable[Page]) -> AsyncIterator[Section]:
+        """Yield the sections of a document whose pages are still being produced."""
+        state = _SplitState(self.headers_to_split_on)
+        async for page in pages:
+            for section in state.feed(page):
+                yield section
+        for section in state.close():
+            yield section
+
+
+class _SplitState:
+    """Per-document state of one split: the open headers, paragraph and section."""
+
+    def __init__(self, headers_to_split_on: list[tuple[str, Optional[str]]]):
+        self.headers = headers_to_split_on
+        self.header_initials = {separator[:1] for separator, _ in headers_to_split_on}
+        self.page_starts: list[int] = []
+        self.page_nums: list[int] = []
+        self.position = 0
+        # Start of a line that continues on the next page
+        self.partial = ""
+        self.partial_start = 0
+        self.header_stack: list[tuple[int, str]] = []
+        # Metadata dicts are replaced, never mutated, so they can be shared by reference
+        self.metadata: dict[str, str] = {}
+        self.current_metadata: dict[str, str] = {}
+        self.in_code_block = False
+        self.opening_fence = ""
+        self.paragraph: list[str] = []
+        self.paragraph_start = 0
+        self.paragraph_end = 0
+        # Open section: [metadata, paragraphs, start, end]
+        self.section: Optional[list] = None
+
+    def feed(self, page: Page) -> list[Section]:
+        """Consume a page and return the sections it closed."""
+        self.page_starts.append(self.position)
+        self.page_nums.append(page.page_num)
+        closed: list[Section] = []
+
+        lines = page.text.split("\n")
+        first = self.partial + lines[0]
+        if len(lines) == 1:
+            self.partial = first
+            self.position += len(page.text)
+            return closed
+
+        position = self.position + len(lines[0])
+        self._process_line(first, self.partial_start, position, closed)
+        position += 1
+        for line in lines[1:-1]:
+            self._process_line(line, position, position + len(line), closed)
+            position += len(line) + 1
+
+        self.partial = lines[-1]
+        self.partial_start = position
+        self.position += len(page.text)
+        return closed
+
+    def close(self) -> list[Section]:
+        """Finish the document and return the remaining sections."""
+        closed: list[Section] = []
+        self._process_line(self.partial, self.partial_start, self.position, closed)
+        self.partial = ""
+        if self.paragraph:
+            self._flush_paragraph(closed)
+        if self.section is not None:
+            closed.append(self._build_section(self.section))
+            self.section = None
+        return closed
+
+    def _process_line(self, line: str, start: int, end: int, closed: list[Section]) -> None:
+        stripped = line.strip()
+        if not stripped.isprintable():
+            stripped = "".join(filter(str.isprintable, stripped))
+
+        if not self.in_code_block:
+            if stripped.startswith("```") and stripped.count("```") == 1:
+                self.in_code_block = True
+                self.opening_fence = "```"
+            elif stripped.startswith("~~~"):
+                self.in_code_block = True
+                self.opening_fence = "~~~"
+        elif stripped.startswith(self.opening_fence):
+            self.in_code_block = False
+            self.opening_fence = ""
+
+        if self.in_code_block:
+            self._add_line(stripped, start, end)
+            return
+
+        is_header = stripped[:1] in self.header_initials and self._process_header(stripped, closed)
+        if not is_header:
+            if stripped:
+                self._add_line(stripped, start, end)
+            elif self.paragraph:
+                self._flush_paragraph(closed)
+
+        self.current_metadata = self.metadata
+
+    def _process_header(self, stripped: str, closed: list[Section]) -> bool:
+        """Open a new header if the line is one, returns False for other lines."""
+        for separator, name in self.headers:
+            if stripped.startswith(separator) and (
+                len(stripped) == len(separator) or stripped[len(separator)] == " "
+            ):
+                if name is not None:
+                    level = separator.count("#")
+                    metadata = dict(self.metadata)
+                    while self.header_stack and self.header_stack[-1][0] >= level:
+                        metadata.pop(self.header_stack.pop()[1], None)
+                    self.header_stack.append((level, name))
+                    metadata[name] = stripped[len(separator):].strip()
+                    self.metadata = metadata
+
+                if self.paragraph:
+                    self._flush_paragraph(closed)
+                return True
+        return False
+
+    def _add_line(self, stripped: str, start: int, end: int) -> None:
+        if not self.paragraph:
+            self.paragraph_start = start
+        self.paragraph.append(stripped)
+        self.paragraph_end = end
+
+    def _flush_paragraph(self, closed: list[Section]) -> None:
+        content = "\n".join(self.paragraph)
+        self.paragraph = []
+        # Paragraphs under the same headers make up one section
+        if self.section is not None and self.section[0] == self.current_metadata:
+            self.section[1].append(content)
+            self.section[3] = self.paragraph_end
+            return
+
+        if self.section is not None:
+            closed.append(self._build_section(self.section))
+        self.section = [self.current_metadata, [content], self.paragraph_start, self.paragraph_end]
+
+    def _build_section(self, section: list) -> Section:
+        metadata, paragraphs, start, end = section
+        return Section(
+            page_content="  \n".join(paragraphs),
+            metadata=dict(metadata),
+            start=start,
+            end=end,
+            first_page=self._page_at(start),
+            last_page=self._page_at(max(start, end - 1)),
+        )
+
+    def _page_at(self, offset: int) -> int:
+        return self.page_nums[bisect_right(self.page_starts, offset) - 1]
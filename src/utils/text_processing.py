@@ -1,18 +1,53 @@
 import re
+from concurrent.futures import Executor
+from functools import lru_cache
+from itertools import filterfalse
 from pathlib import Path
+from typing import AbstractSet, Iterable, Optional
 
-def load_stopwords(*paths: str) -> set[str]:
+def load_stopwords(*paths: str) -> frozenset[str]:
     words = set()
     for p in paths:
         for line in Path(p).read_text(encoding="utf-8").splitlines():
             s = line.strip()
             if s and not s.startswith("#"):
                 words.add(s.lower())
-    return words
+    return frozenset(words)
+
+@lru_cache(maxsize=None)
+def shared_stopwords(*paths: str) -> frozenset[str]:
+    """Load stopwords once per process and hand every caller the same frozen set."""
+    return load_stopwords(*paths)
 
 WORD_RE = re.compile(r"[A-Za-z][A-Za-z'-]*")
 
-def clean_text(text: str, stop: set[str]) -> str:
-    tokens = [t.lower() for t in WORD_RE.findall(text)]
-    kept = [t for t in tokens if t not in stop]
-    return " ".join(kept)
\ No newline at end of file
+def clean_text(text: str, stop: AbstractSet[str]) -> str:
+    return " ".join(filterfalse(stop.__contains__, map(str.lower, WORD_RE.findall(text))))
+
+def _clean_batch(texts: list[str], stop: AbstractSet[str]) -> list[str]:
+    findall, is_stopword = WORD_RE.findall, stop.__contains__
+    return [" ".join(filterfalse(is_stopword, map(str.lower, findall(text)))) for text in texts]
+
+def clean_texts(
+    texts: Iterable[str],
+    stop: AbstractSet[str],
+    executor: Optional[Executor] = None,
+    chunk_size: int = 2000
+) -> list[str]:
+    """Clean many texts at once, returning exactly what `clean_text` returns for each.
+
+    Tokenizing dominates the cost, so a large corpus is best given an executor
+    (e.g. a ProcessPoolExecutor): the texts are then split into chunks of
+    `chunk_size` that are cleaned in parallel.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if executor is None or len(texts) <= chunk_size:
+        return _clean_batch(texts, stop)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    cleaned = []
+    for chunk in executor.map(_clean_batch, chunks, [stop] * len(chunks)):
+        cleaned.extend(chunk)
+    return cleaned
@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+import tiktoken
+
+# Used when tiktoken does not know a (deployment specific) model name
+DEFAULT_ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """Return the process-wide tokenizer for a model, loading it only once."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+def count_tokens(text: str, model_name: str) -> int:
+    return len(get_encoding(model_name).encode_ordinary(text))
+
+def count_tokens_batch(texts: list[str], model_name: str) -> list[int]:
+    """Count tokens for many texts with a single batched (multi-threaded) encode call."""
+    if not texts:
+        return []
+    return [len(tokens) for tokens in get_encoding(model_name).encode_ordinary_batch(texts)]
+
+def split_by_tokens(text: str, model_name: str, max_tokens: int, overlap: int = 0) -> list[str]:
+    """Split text into windows of at most max_tokens tokens, each repeating the last `overlap` tokens of the previous one."""
+    encoding = get_encoding(model_name)
+    tokens = encoding.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return [text]
+
+    step = max(1, max_tokens - overlap)
+    windows = []
+    for start in range(0, len(tokens), step):
+        windows.append(encoding.decode(tokens[start:start + max_tokens]))
+        if start + max_tokens >= len(tokens):
+            break
+    return windows